@@ -0,0 +1,569 @@
+#!/usr/bin/env python3
+"""
+LeetCode 每日脚本端到端基准测试
+在本地启动替身服务（题目列表、GraphQL questionData、chat/completions），
+用临时配置和输出目录多次运行 leetcode_daily.py，统计吞吐量、各阶段 p50/p95 和峰值内存；
+--startup 模式检查脚本的导入耗时预算，--render 模式在现有题目上对比各 Markdown 渲染引擎
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Optional
+from urllib.parse import urlsplit
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块，不统计峰值内存
+    resource = None
+
+from leetcode_daily import STARTUP_BUDGET_MS, HTMLGenerator, MarkdownRenderer, log_info
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DAILY_SCRIPT = os.path.join(SCRIPT_DIR, 'leetcode_daily.py')
+
+# 导入 leetcode_daily 时不应加载的模块（应在首次使用时才导入）
+LAZY_MODULES = ('requests', 'urllib3', 'asyncio', 'sqlite3', 'markdown2', 'concurrent.futures')
+
+class StandInServer:
+    """本地替身服务
+
+    模拟 /api/problems/all/、/graphql（questionData）和 /v1/chat/completions，
+    每个接口的延迟、错误率和题目数量均可配置。错误请求交替返回 503 和 429。
+    """
+    DIFFICULTY_LEVELS = [1, 2, 3]
+
+    def __init__(self, catalog_size: int = 3000, latency: Optional[Dict[str, float]] = None,
+                 error_rate: float = 0.0, answer_chars: int = 3000, seed: int = 0):
+        self.catalog_size = catalog_size
+        self.latency = latency or {}
+        self.error_rate = error_rate
+        self.answer_chars = answer_chars
+        self.requests = {}
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._servers = []
+        self._catalog = self._build_catalog()
+
+    def _build_catalog(self) -> bytes:
+        pairs = []
+        for i in range(1, self.catalog_size + 1):
+            pairs.append({
+                'stat': {
+                    'question_id': i,
+                    'frontend_question_id': str(i),
+                    'question__title_slug': f'bench-question-{i}'
+                },
+                'difficulty': {'level': self.DIFFICULTY_LEVELS[i % 3]}
+            })
+        return json.dumps({'stat_status_pairs': pairs}).encode('utf-8')
+
+    def question(self, slug: str) -> Dict:
+        """生成与 questionData 响应结构一致的题目详情"""
+        number = slug.rsplit('-', 1)[-1]
+        level = self.DIFFICULTY_LEVELS[int(number) % 3] if number.isdigit() else 1
+        paragraph = f'<p>给你一个整数数组 <code>nums</code>，这是第 {number} 道基准测试题目。</p>'
+        return {
+            'questionId': number,
+            'questionFrontendId': number,
+            'title': f'Bench Question {number}',
+            'titleSlug': slug,
+            'content': paragraph * 10,
+            'translatedTitle': f'基准题目 {number}',
+            'translatedContent': paragraph * 10 + '<pre>输入：nums = [1,2,3]\n输出：6</pre>',
+            'difficulty': {1: 'Easy', 2: 'Medium', 3: 'Hard'}[level],
+            'topicTags': [{'name': 'Array', 'translatedName': '数组'},
+                          {'name': 'Hash Table', 'translatedName': '哈希表'}],
+            'codeSnippets': [{'lang': 'Go', 'langSlug': 'golang',
+                              'code': 'func solve(nums []int) int {\n\n}'}],
+            'sampleTestCase': '[1,2,3]',
+            'hints': ['使用哈希表']
+        }
+
+    def answer(self) -> str:
+        """生成固定长度的 Markdown 解答"""
+        block = '### 解法一：哈希表\n思路：遍历数组并记录出现过的元素。\n```go\nfunc solve(nums []int) int {\n    return 0\n}\n```\n'
+        return (block * (self.answer_chars // len(block) + 1))[:self.answer_chars]
+
+    def _delay(self, endpoint: str) -> float:
+        base = self.latency.get(endpoint, 0.0)
+        with self._lock:
+            # ±20% 抖动，让分位数有意义
+            return base * self._random.uniform(0.8, 1.2)
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.errors += 1
+                return True
+        return False
+
+    def _count(self, endpoint: str):
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def send_body(self, status: int, body: bytes, content_type: str = 'application/json',
+                          headers: Optional[Dict] = None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def send_error_response(self):
+                if server.errors % 2:
+                    self.send_body(503, b'{"error": "unavailable"}')
+                else:
+                    self.send_body(429, b'{"error": "rate limited"}', headers={'Retry-After': '1'})
+
+            def read_json(self) -> Dict:
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length) or b'{}')
+
+            def do_GET(self):
+                if urlsplit(self.path).path != '/api/problems/all/':
+                    self.send_body(404, b'{}')
+                    return
+                server._count('catalog')
+                time.sleep(server._delay('catalog'))
+                if server._should_fail():
+                    self.send_error_response()
+                    return
+                self.send_body(200, server._catalog, headers={'ETag': f'"catalog-{server.catalog_size}"'})
+
+            def do_POST(self):
+                path = urlsplit(self.path).path
+                payload = self.read_json()
+                if path == '/graphql':
+                    server._count('detail')
+                    time.sleep(server._delay('detail'))
+                    if server._should_fail():
+                        self.send_error_response()
+                        return
+                    slug = (payload.get('variables') or {}).get('titleSlug', '')
+                    body = json.dumps({'data': {'question': server.question(slug)}}, ensure_ascii=False)
+                    self.send_body(200, body.encode('utf-8'))
+                elif path == '/v1/chat/completions':
+                    server._count('ai')
+                    if server._should_fail():
+                        time.sleep(server._delay('ai') * 0.1)
+                        self.send_error_response()
+                        return
+                    if payload.get('stream'):
+                        self.stream_answer()
+                    else:
+                        time.sleep(server._delay('ai'))
+                        body = json.dumps({'choices': [{'message': {'content': server.answer()}}]}, ensure_ascii=False)
+                        self.send_body(200, body.encode('utf-8'))
+                else:
+                    self.send_body(404, b'{}')
+
+            def stream_answer(self):
+                # 首个 token 前等待 20% 的延迟，其余时间均匀分布在各个分块之间
+                delay = server._delay('ai')
+                text = server.answer()
+                chunks = [text[i:i + 50] for i in range(0, len(text), 50)]
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                time.sleep(delay * 0.2)
+                for chunk in chunks:
+                    event = 'data: ' + json.dumps({'choices': [{'delta': {'content': chunk}}]}, ensure_ascii=False) + '\n\n'
+                    self.write_chunk(event.encode('utf-8'))
+                    time.sleep(delay * 0.8 / len(chunks))
+                self.write_chunk(b'data: [DONE]\n\n')
+                self.write_chunk(b'')
+
+            def write_chunk(self, data: bytes):
+                self.wfile.write(b'%x\r\n' % len(data) + data + b'\r\n')
+                self.wfile.flush()
+
+        return Handler
+
+    def start(self, count: int = 1) -> List[str]:
+        """启动 count 个监听端口（不同端口对应不同的限流主机），返回各自的根地址"""
+        urls = []
+        for _ in range(count):
+            httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+            httpd.daemon_threads = True
+            threading.Thread(target=httpd.serve_forever, daemon=True).start()
+            self._servers.append(httpd)
+            urls.append(f'http://127.0.0.1:{httpd.server_port}')
+        return urls
+
+    def stop(self):
+        for httpd in self._servers:
+            httpd.shutdown()
+            httpd.server_close()
+        self._servers.clear()
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近秩法计算分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def build_config(base_config: Dict, workdir: str, leetcode_url: str, ai_url: str, args: argparse.Namespace) -> Dict:
+    """基于示例配置生成指向替身服务的临时配置"""
+    config = json.loads(json.dumps(base_config))
+    config['difficulties'] = {'easy': args.easy, 'medium': args.medium, 'hard': args.hard}
+    config['leetcode_url'] = leetcode_url
+    config['output_dir'] = os.path.join(workdir, 'leetcode_questions')
+    config['history_file'] = os.path.join(workdir, 'question_history.json')
+    config['selection_pool_file'] = os.path.join(workdir, 'selection_pool.json')
+    config.setdefault('catalog', {})['cache_file'] = os.path.join(workdir, 'catalog_cache.json')
+    config['catalog']['offline'] = False
+    config.setdefault('question_store', {})['db_file'] = os.path.join(workdir, 'question_store.sqlite')
+    config.setdefault('ai_cache', {})['cache_dir'] = os.path.join(workdir, '.ai_cache')
+    config['metrics'] = {'enabled': True, 'file': os.path.join(workdir, 'metrics.jsonl'), 'prometheus_textfile': ''}
+    # 生成 HTML 和历史 JSON，但不会推送（用户名保持占位值）
+    config['github_pages'] = dict(config.get('github_pages', {}), enabled=True, username='YOUR_GITHUB_USERNAME')
+
+    deepseek = config.setdefault('deepseek', {})
+    deepseek.update({
+        'enabled': True,
+        'mode': 'deepseek',
+        'api_key': 'benchmark',
+        'base_url': f'{ai_url}/v1',
+        'stream': args.stream
+    })
+
+    # 把示例配置中真实主机的限流参数映射到对应的替身端口
+    http = config.setdefault('http', {})
+    if args.no_rate_limit:
+        http['rate_limits'] = {'default': {'rate': 10000, 'burst': 10000}}
+    else:
+        limits = dict(http.get('rate_limits', {}))
+        for real_host, url in (('leetcode.cn', leetcode_url), ('api.deepseek.com', ai_url)):
+            if real_host in limits:
+                limits[urlsplit(url).netloc] = limits.pop(real_host)
+        http['rate_limits'] = limits
+    return config
+
+def reset_caches(config: Dict):
+    """删除本地缓存，使下一次运行的每个阶段都访问替身服务"""
+    for path in (config['catalog']['cache_file'], config['question_store']['db_file']):
+        if os.path.exists(path):
+            os.remove(path)
+    shutil.rmtree(config['ai_cache']['cache_dir'], ignore_errors=True)
+
+def run_benchmark(args: argparse.Namespace) -> Dict:
+    """启动替身服务并多次运行主脚本，返回统计结果"""
+    with open(args.base_config, 'r', encoding='utf-8') as f:
+        base_config = json.load(f)
+
+    server = StandInServer(
+        catalog_size=args.catalog_size,
+        latency={'catalog': args.catalog_latency, 'detail': args.detail_latency, 'ai': args.ai_latency},
+        error_rate=args.error_rate,
+        answer_chars=args.answer_chars,
+        seed=args.seed
+    )
+    leetcode_url, ai_url = server.start(2)
+    workdir = tempfile.mkdtemp(prefix='leetcode_bench_')
+    config = build_config(base_config, workdir, leetcode_url, ai_url, args)
+    config_file = os.path.join(workdir, 'config.json')
+    with open(config_file, 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+
+    log_info(f"替身服务: LeetCode {leetcode_url}，AI {ai_url}")
+    log_info(f"临时目录: {workdir}")
+
+    walls = []
+    try:
+        for run in range(1, args.runs + 1):
+            if not args.warm:
+                reset_caches(config)
+            start = time.perf_counter()
+            with open(os.path.join(workdir, f'run_{run}.log'), 'w', encoding='utf-8') as out:
+                result = subprocess.run(
+                    [sys.executable, DAILY_SCRIPT, '--config', config_file],
+                    cwd=workdir,
+                    stdout=None if args.verbose else out,
+                    stderr=subprocess.STDOUT
+                )
+            walls.append(time.perf_counter() - start)
+            log_info(f"第 {run}/{args.runs} 次运行完成: {walls[-1]:.2f} 秒 (exit code {result.returncode})")
+    finally:
+        server.stop()
+
+    runs = []
+    metrics_file = config['metrics']['file']
+    if os.path.exists(metrics_file):
+        with open(metrics_file, 'r', encoding='utf-8') as f:
+            runs = [json.loads(line) for line in f if line.strip()]
+
+    stages = {}
+    for record in runs:
+        for span in record.get('spans', []):
+            stages.setdefault(span['stage'], []).append(span['ms'])
+
+    saved = sum(record.get('saved', 0) for record in runs)
+    total_wall = sum(walls)
+    peak_rss_mb = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        # Linux 单位为 KB，macOS 为字节
+        peak_rss_mb = peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+    summary = {
+        'runs': args.runs,
+        'questions_saved': saved,
+        'wall_seconds': round(total_wall, 3),
+        'throughput_per_min': round(saved / total_wall * 60, 2) if total_wall else 0.0,
+        'run_p50_seconds': round(percentile(walls, 50), 3),
+        'run_p95_seconds': round(percentile(walls, 95), 3),
+        'peak_rss_mb': round(peak_rss_mb, 1) if peak_rss_mb is not None else None,
+        'server_requests': dict(server.requests),
+        'server_errors': server.errors,
+        'stages': {
+            stage: {
+                'count': len(values),
+                'p50_ms': percentile(values, 50),
+                'p95_ms': percentile(values, 95),
+                'max_ms': max(values)
+            }
+            for stage, values in stages.items()
+        },
+        'workdir': workdir
+    }
+    if not args.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+        summary['workdir'] = None
+    return summary
+
+def measure_startup(samples: int = 5) -> Dict:
+    """用 -X importtime 测量导入 leetcode_daily 的耗时，并记录导入了哪些模块"""
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)  # 允许写入 .pyc，测量的是缓存命中后的启动
+    command = [sys.executable, '-X', 'importtime', '-c', 'import leetcode_daily']
+    subprocess.run(command, cwd=SCRIPT_DIR, env=env, capture_output=True)  # 预热 .pyc
+
+    import_ms = []
+    modules = set()
+    slowest = {}
+    for _ in range(samples):
+        result = subprocess.run(command, cwd=SCRIPT_DIR, env=env, capture_output=True, text=True)
+        subtree = []  # 输出中子模块先于父模块出现，遇到顶层模块时结算
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative_us, name = line.split('|')
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            name = name.strip()
+            if depth > 0:
+                subtree.append((depth, name, int(cumulative_us) / 1000))
+                continue
+            if name == 'leetcode_daily':
+                import_ms.append(int(cumulative_us) / 1000)
+                for child_depth, child, ms in subtree:
+                    modules.add(child)
+                    if child_depth == 1:
+                        slowest[child] = max(slowest.get(child, 0), ms)
+            subtree = []
+
+    walls = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-m', 'leetcode_daily', '--help'], cwd=SCRIPT_DIR, env=env,
+                       stdout=subprocess.DEVNULL)
+        walls.append((time.perf_counter() - start) * 1000)
+    baseline = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], env=env)
+        baseline.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'import_ms': round(percentile(import_ms, 50), 1),
+        'help_wall_ms': round(percentile(walls, 50), 1),
+        'interpreter_ms': round(percentile(baseline, 50), 1),
+        'eager_lazy_modules': sorted(name for name in LAZY_MODULES if name in modules),
+        'slowest': sorted(slowest.items(), key=lambda item: -item[1])[:8]
+    }
+
+def run_startup_check(args: argparse.Namespace) -> bool:
+    """检查导入耗时是否在预算内，且重量级模块没有在导入时加载"""
+    result = measure_startup(args.samples)
+    budget = args.budget or STARTUP_BUDGET_MS
+    log_info("=" * 60)
+    log_info(f"导入 leetcode_daily: {result['import_ms']:.1f} ms（预算 {budget} ms）")
+    log_info(f"python -m leetcode_daily --help: {result['help_wall_ms']:.1f} ms"
+             f"（其中解释器启动约 {result['interpreter_ms']:.1f} ms）")
+    for name, ms in result['slowest']:
+        log_info(f"  {name:<28}{ms:>8.1f} ms")
+
+    ok = True
+    if result['import_ms'] > budget:
+        log_info(f"❌ 导入耗时超出预算 {result['import_ms'] - budget:.1f} ms")
+        ok = False
+    if result['eager_lazy_modules']:
+        log_info(f"❌ 以下模块应按需导入，却在导入脚本时被加载: {', '.join(result['eager_lazy_modules'])}")
+        ok = False
+    if ok:
+        log_info("✓ 启动耗时检查通过")
+    log_info("=" * 60)
+    return ok
+
+def run_render_benchmark(args: argparse.Namespace) -> Dict:
+    """在题目 Markdown 语料上对比各渲染引擎，以及片段缓存命中时的耗时"""
+    workdir = tempfile.mkdtemp(prefix='leetcode_render_')
+    try:
+        parser = HTMLGenerator(os.path.join(workdir, 'docs'))
+        files = sorted(f for f in os.listdir(args.corpus) if f.endswith('.md'))
+        texts = []
+        for name in files:
+            info = parser.parse_markdown_file(os.path.join(args.corpus, name))
+            if info:
+                texts.append(info['content'])
+        corpus_mb = sum(len(text.encode('utf-8')) for text in texts) / (1024 * 1024)
+        log_info(f"语料: {len(texts)} 个文件，{corpus_mb:.2f} MB（{args.corpus}）")
+
+        results = {}
+        for backend in MarkdownRenderer.BACKENDS:
+            render = MarkdownRenderer.load_backend(backend)
+            if render is None:
+                results[backend] = None
+                continue
+            samples = []
+            for _ in range(args.repeat):
+                for text in texts:
+                    start = time.perf_counter()
+                    render(text)
+                    samples.append((time.perf_counter() - start) * 1000)
+            results[backend] = samples
+
+        # 片段缓存：第一遍写入，之后每遍都应全部命中
+        renderer = MarkdownRenderer({'cache_dir': os.path.join(workdir, 'render_cache')})
+        for text in texts:
+            renderer.render(text)
+        samples = []
+        for _ in range(args.repeat):
+            for text in texts:
+                start = time.perf_counter()
+                renderer.render(text)
+                samples.append((time.perf_counter() - start) * 1000)
+        results[f'{renderer.backend} (缓存命中)'] = samples
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    summary = {'files': len(texts), 'corpus_mb': round(corpus_mb, 3), 'repeat': args.repeat, 'backends': {}}
+    for backend, samples in results.items():
+        if samples is None:
+            summary['backends'][backend] = None
+            continue
+        total_s = sum(samples) / 1000 / args.repeat
+        summary['backends'][backend] = {
+            'total_ms': round(total_s * 1000, 1),
+            'p50_ms': round(percentile(samples, 50), 3),
+            'p95_ms': round(percentile(samples, 95), 3),
+            'mb_per_s': round(corpus_mb / total_s, 2) if total_s else 0.0
+        }
+    return summary
+
+def print_render_report(summary: Dict):
+    """输出渲染引擎对比报告"""
+    baseline = summary['backends'].get('markdown2')
+    log_info("=" * 60)
+    log_info(f"每遍渲染 {summary['files']} 个文件（{summary['corpus_mb']:.2f} MB），重复 {summary['repeat']} 遍取平均")
+    log_info(f"{'引擎':<22}{'总耗时 (ms)':>12}{'p50 (ms)':>10}{'p95 (ms)':>10}{'MB/s':>8}{'加速比':>8}")
+    for backend, stat in summary['backends'].items():
+        if stat is None:
+            log_info(f"{backend:<24}未安装")
+            continue
+        speedup = baseline['total_ms'] / stat['total_ms'] if baseline and stat['total_ms'] else 0
+        log_info(f"{backend:<24}{stat['total_ms']:>12.1f}{stat['p50_ms']:>10.2f}{stat['p95_ms']:>10.2f}"
+                 f"{stat['mb_per_s']:>8.2f}{speedup:>8.1f}x")
+    log_info("=" * 60)
+
+def print_report(summary: Dict):
+    """输出文本报告"""
+    log_info("=" * 60)
+    log_info(f"运行 {summary['runs']} 次，保存 {summary['questions_saved']} 道题目，总耗时 {summary['wall_seconds']:.2f} 秒")
+    log_info(f"吞吐量: {summary['throughput_per_min']:.2f} 题/分钟；单次运行 p50 {summary['run_p50_seconds']:.2f} 秒，"
+             f"p95 {summary['run_p95_seconds']:.2f} 秒")
+    if summary['peak_rss_mb'] is not None:
+        log_info(f"峰值内存 (RSS): {summary['peak_rss_mb']:.1f} MB")
+    log_info(f"替身服务请求: {summary['server_requests']}，注入错误 {summary['server_errors']} 次")
+    log_info("")
+    log_info(f"{'阶段':<14}{'次数':>6}{'p50 (ms)':>12}{'p95 (ms)':>12}{'max (ms)':>12}")
+    for stage, stat in summary['stages'].items():
+        log_info(f"{stage:<16}{stat['count']:>6}{stat['p50_ms']:>12.1f}{stat['p95_ms']:>12.1f}{stat['max_ms']:>12.1f}")
+    if summary['workdir']:
+        log_info(f"临时目录已保留: {summary['workdir']}")
+    log_info("=" * 60)
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='LeetCode 每日脚本端到端基准测试（本地替身服务）')
+    parser.add_argument('--startup', action='store_true',
+                        help='只检查启动耗时：导入耗时超出预算或重量级模块被提前导入时返回非 0')
+    parser.add_argument('--samples', type=int, default=5, help='--startup 模式的采样次数')
+    parser.add_argument('--render', action='store_true',
+                        help='只对比 Markdown 渲染引擎（使用 --corpus 中的题目文件）')
+    parser.add_argument('--corpus', default=os.path.join(SCRIPT_DIR, 'leetcode_questions'),
+                        help='--render 模式使用的 Markdown 目录')
+    parser.add_argument('--repeat', type=int, default=3, help='--render 模式的重复遍数')
+    parser.add_argument('--budget', type=float, default=0,
+                        help=f'--startup 模式的导入耗时预算（毫秒，默认 {STARTUP_BUDGET_MS}）')
+    parser.add_argument('--runs', type=int, default=3, help='运行次数')
+    parser.add_argument('--easy', type=int, default=1, help='每次选择的简单题数量')
+    parser.add_argument('--medium', type=int, default=1, help='每次选择的中等题数量')
+    parser.add_argument('--hard', type=int, default=1, help='每次选择的困难题数量')
+    parser.add_argument('--catalog-size', type=int, default=3000, help='替身题目列表中的题目数量')
+    parser.add_argument('--catalog-latency', type=float, default=0.3, help='题目列表接口延迟（秒）')
+    parser.add_argument('--detail-latency', type=float, default=0.2, help='GraphQL 详情接口延迟（秒）')
+    parser.add_argument('--ai-latency', type=float, default=2.0, help='chat/completions 接口延迟（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='注入 429/503 错误的概率（0~1）')
+    parser.add_argument('--answer-chars', type=int, default=3000, help='AI 解答长度（字符）')
+    parser.add_argument('--stream', action='store_true', help='使用 SSE 流式输出')
+    parser.add_argument('--warm', action='store_true', help='运行之间保留本地缓存（默认每次清空）')
+    parser.add_argument('--no-rate-limit', action='store_true', help='放开客户端限流，测量流水线本身的上限')
+    parser.add_argument('--base-config', default=os.path.join(SCRIPT_DIR, 'config.example.json'),
+                        help='作为基础的配置文件（默认 config.example.json）')
+    parser.add_argument('--seed', type=int, default=0, help='延迟抖动和错误注入的随机种子')
+    parser.add_argument('--json', dest='json_output', help='同时把结果写入 JSON 文件')
+    parser.add_argument('--keep', action='store_true', help='保留临时目录（含每次运行的日志和 metrics.jsonl）')
+    parser.add_argument('--verbose', action='store_true', help='直接输出主脚本日志')
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    if args.startup:
+        sys.exit(0 if run_startup_check(args) else 1)
+
+    if args.render:
+        summary = run_render_benchmark(args)
+        print_render_report(summary)
+    else:
+        summary = run_benchmark(args)
+        print_report(summary)
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,133 @@
 // LeetCode 每日题目 - 分页显示版本
 
+// 转义插入 innerHTML 的文本
+function escapeHtml(text) {
+    return String(text ?? '').replace(/[&<>"']/g, ch => ({
+        '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+    })[ch]);
+}
+
+// 构建时生成的搜索索引（docs/search/），分词规则与 leetcode_daily.py 中的
+// HTMLGenerator.search_tokens / search_shard 保持一致
+class SearchIndex {
+    constructor(baseUrl = 'search/') {
+        this.baseUrl = baseUrl;
+        this.meta = null;
+        this.shards = new Map();
+        this.chunks = new Map();
+    }
+
+    async fetchJSON(name) {
+        const version = this.meta ? this.meta.doc_count : Date.now();
+        const response = await fetch(`${this.baseUrl}${name}?v=${version}`);
+        if (!response.ok) {
+            throw new Error(`无法加载搜索索引 ${name}`);
+        }
+        return response.json();
+    }
+
+    async loadMeta() {
+        if (!this.meta) {
+            this.meta = await this.fetchJSON('meta.json');
+        }
+        return this.meta;
+    }
+
+    static tokenize(text) {
+        const tokens = [];
+        const runs = (text || '').toLowerCase().match(/[a-z0-9]+|[\u3400-\u9fff]+/g) || [];
+        runs.forEach(run => {
+            if (run[0] < '\u3400' || run.length === 1) {
+                tokens.push(run);
+            } else {
+                for (let i = 0; i < run.length - 1; i++) {
+                    tokens.push(run.substring(i, i + 2));
+                }
+            }
+        });
+        return [...new Set(tokens)];
+    }
+
+    shardOf(token) {
+        let h = 0x811c9dc5;
+        for (const ch of token) {
+            h ^= ch.codePointAt(0);
+            h = Math.imul(h, 0x01000193) >>> 0;
+        }
+        return h % this.meta.shards;
+    }
+
+    async loadShard(shardId) {
+        if (!this.shards.has(shardId)) {
+            const name = `idx-${String(shardId).padStart(2, '0')}.json`;
+            this.shards.set(shardId, this.fetchJSON(name).catch(() => ({})));
+        }
+        return this.shards.get(shardId);
+    }
+
+    async loadChunk(chunkId) {
+        if (!this.chunks.has(chunkId)) {
+            this.chunks.set(chunkId, this.fetchJSON(`docs-${chunkId}.json`).catch(() => []));
+        }
+        return this.chunks.get(chunkId);
+    }
+
+    async search(query, limit = 50) {
+        const tokens = SearchIndex.tokenize(query);
+        if (tokens.length === 0) {
+            return [];
+        }
+        await this.loadMeta();
+
+        // 只下载查询词所在的倒排分片，对所有词项的文档列表求交集
+        let matched = null;
+        for (const token of tokens) {
+            const shard = await this.loadShard(this.shardOf(token));
+            const postings = new Set(shard[token] || []);
+            matched = matched === null
+                ? postings
+                : new Set([...matched].filter(id => postings.has(id)));
+            if (matched.size === 0) {
+                return [];
+            }
+        }
+
+        // 新题目的文档编号更大，按编号倒序展示
+        const ids = [...matched].sort((a, b) => b - a).slice(0, limit);
+        const results = [];
+        for (const id of ids) {
+            const chunk = await this.loadChunk(Math.floor(id / this.meta.chunk_size));
+            const doc = chunk[id % this.meta.chunk_size];
+            if (doc) {
+                const [number, title, difficulty, file, date, tags] = doc;
+                results.push({ number, title, difficulty, file, date, tags });
+            }
+        }
+        return results;
+    }
+}
+
 class LeetCodeApp {
     constructor() {
         this.allRecords = [];
         this.currentView = 'list'; // 'list' or 'detail'
 
+        // 按月分片的历史记录（history.json 只包含最近记录和分片清单）
+        this.manifest = null;
+        this.shards = [];
+        this.loadedShards = new Set();
+        this.totalRecords = 0;
+
         // 分页相关
         this.currentPage = 1;
         this.pageSize = 4;
         this.totalPages = 1;
 
+        // 搜索
+        this.searchIndex = new SearchIndex();
+        this.searchTimer = null;
+        this.searchSeq = 0;
+
         // 鸡汤文案库
         this.motivationQuotes = [
             "代码如诗，算法如画。每一道题目都是通往卓越的阶梯。",
@@ -98,6 +216,13 @@ class LeetCodeApp {
             }
         });
 
+        // 搜索框（输入停顿后再查询）
+        document.getElementById('searchInput').addEventListener('input', (e) => {
+            clearTimeout(this.searchTimer);
+            const query = e.target.value;
+            this.searchTimer = setTimeout(() => this.runSearch(query), 150);
+        });
+
         const pageSizeSelector = document.getElementById('pageSize');
         pageSizeSelector.addEventListener('change', (e) => {
             const oldPageSize = this.pageSize;
@@ -129,19 +254,20 @@ class LeetCodeApp {
 
     async loadHistory() {
         try {
-            // 添加时间戳防止浏览器缓存
-            const response = await fetch(`history.json?t=${Date.now()}`);
+            // 发布时首页写入 history.json 的内容哈希（data-version）作为版本号，内容不变时命中浏览器缓存；
+            // 未经资源处理的首页没有版本号，退回时间戳
+            const versionMeta = document.querySelector('meta[name="data-version"]');
+            const version = versionMeta ? versionMeta.content : Date.now();
+            const response = await fetch(`history.json?v=${version}`);
             if (!response.ok) {
                 throw new Error('无法加载历史记录');
             }
 
             const data = await response.json();
-            this.allRecords = data.records || [];
-
-            // 按时间倒序排序（最新的在前）
-            this.allRecords.sort((a, b) => {
-                return new Date(b.date) - new Date(a.date);
-            });
+            this.manifest = data;
+            this.shards = data.shards || [];
+            this.mergeRecords(data.records || []);
+            this.totalRecords = data.total_records || this.allRecords.length;
 
             // 更新统计
             this.updateStats();
@@ -149,26 +275,67 @@ class LeetCodeApp {
         } catch (error) {
             console.error('加载历史记录失败:', error);
             this.allRecords = [];
+            this.totalRecords = 0;
+        }
+    }
+
+    mergeRecords(records) {
+        // 按 record_id 去重后合并，按时间倒序排序（最新的在前）
+        const seen = new Set(this.allRecords.map(r => r.record_id));
+        records.forEach(record => {
+            if (!seen.has(record.record_id)) {
+                seen.add(record.record_id);
+                this.allRecords.push(record);
+            }
+        });
+        this.allRecords.sort((a, b) => {
+            return new Date(b.date) - new Date(a.date);
+        });
+    }
+
+    async ensureRecords(count) {
+        // 翻页到尚未加载的范围时，按从新到旧的顺序加载月度分片
+        for (const shard of this.shards) {
+            if (this.allRecords.length >= Math.min(count, this.totalRecords)) {
+                break;
+            }
+            if (this.loadedShards.has(shard.file)) {
+                continue;
+            }
+            try {
+                // 历史月份的分片不会再变化，用记录数作为版本号即可命中缓存
+                const response = await fetch(`${shard.file}?v=${shard.count}`);
+                if (!response.ok) {
+                    throw new Error(`无法加载分片 ${shard.file}`);
+                }
+                const data = await response.json();
+                this.loadedShards.add(shard.file);
+                this.mergeRecords(data.records || []);
+            } catch (error) {
+                console.error('加载历史分片失败:', error);
+                this.loadedShards.add(shard.file);
+            }
         }
     }
 
     calculatePagination() {
-        this.totalPages = Math.ceil(this.allRecords.length / this.pageSize);
+        this.totalPages = Math.ceil(this.totalRecords / this.pageSize);
         if (this.currentPage > this.totalPages) {
             this.currentPage = this.totalPages || 1;
         }
     }
 
-    renderPage() {
+    async renderPage() {
         this.calculatePagination();
 
         // 更新标题
         document.getElementById('contentTitle').textContent = '所有记录';
         document.getElementById('contentSubtitle').textContent =
-            `共 ${this.allRecords.length} 条记录`;
+            `共 ${this.totalRecords} 条记录`;
 
-        // 计算当前页的记录
+        // 计算当前页的记录（必要时先加载更早的分片）
         const startIndex = (this.currentPage - 1) * this.pageSize;
+        await this.ensureRecords(startIndex + this.pageSize);
         const endIndex = Math.min(startIndex + this.pageSize, this.allRecords.length);
         const pageRecords = this.allRecords.slice(startIndex, endIndex);
 
@@ -250,6 +417,55 @@ class LeetCodeApp {
         }).join('');
     }
 
+    async runSearch(query) {
+        const seq = ++this.searchSeq;
+        const resultsEl = document.getElementById('searchResults');
+        const listElements = [
+            document.getElementById('paginationControls'),
+            document.getElementById('recordList')
+        ];
+
+        if (!query.trim()) {
+            resultsEl.classList.remove('active');
+            resultsEl.innerHTML = '';
+            listElements.forEach(el => el.style.display = '');
+            return;
+        }
+
+        let results = [];
+        try {
+            results = await this.searchIndex.search(query);
+        } catch (error) {
+            console.error('搜索失败:', error);
+        }
+        // 忽略已过期的查询结果
+        if (seq !== this.searchSeq) {
+            return;
+        }
+
+        const difficultyMap = {
+            'easy': '简单',
+            'medium': '中等',
+            'hard': '困难'
+        };
+
+        listElements.forEach(el => el.style.display = 'none');
+        resultsEl.classList.add('active');
+        resultsEl.innerHTML = `<div class="search-summary">找到 ${results.length} 道题目</div>` +
+            results.map(q => `
+                <div class="question-card clickable" data-file="${escapeHtml(q.file)}" onclick="app.viewQuestion(this.dataset.file)">
+                    <div class="question-header">
+                        <span class="question-number">${escapeHtml(q.number)}. ${escapeHtml(q.title)}</span>
+                        <span class="difficulty-badge difficulty-${q.difficulty}">
+                            ${difficultyMap[q.difficulty] || '未知'}
+                        </span>
+                        <div class="record-arrow">→</div>
+                    </div>
+                    <div class="search-result-meta">${escapeHtml(q.date)}${q.tags && q.tags.length ? ' · ' + escapeHtml(q.tags.join(', ')) : ''}</div>
+                </div>
+            `).join('');
+    }
+
     viewRecord(globalIndex) {
         const record = this.allRecords[globalIndex];
         if (!record) return;
@@ -297,6 +513,11 @@ class LeetCodeApp {
     }
 
     viewQuestion(filename) {
+        // 共享外壳模式下直接打开外壳页，省去旧地址的一次跳转
+        if (this.manifest && this.manifest.page_mode === 'shell') {
+            window.location.href = `question.html#${filename.replace(/\.html$/, '')}`;
+            return;
+        }
         // 跳转到题目详情页
         window.location.href = filename;
     }
@@ -311,18 +532,24 @@ class LeetCodeApp {
     }
 
     updateStats() {
-        // 更新统计数据
-        const totalQuestions = this.allRecords.reduce((sum, record) => sum + record.count, 0);
-
-        // 计算连续天数（按日期去重）
-        const uniqueDates = new Set();
-        this.allRecords.forEach(record => {
-            const dateOnly = record.date.split(' ')[0];
-            uniqueDates.add(dateOnly);
-        });
+        // 更新统计数据（分片格式直接使用清单中的汇总值）
+        let totalQuestions = this.manifest && this.manifest.total_questions;
+        let activeDays = this.manifest && this.manifest.active_days;
+
+        if (totalQuestions === undefined || activeDays === undefined) {
+            totalQuestions = this.allRecords.reduce((sum, record) => sum + record.count, 0);
+
+            // 计算连续天数（按日期去重）
+            const uniqueDates = new Set();
+            this.allRecords.forEach(record => {
+                const dateOnly = record.date.split(' ')[0];
+                uniqueDates.add(dateOnly);
+            });
+            activeDays = uniqueDates.size;
+        }
 
         document.getElementById('totalQuestions').textContent = totalQuestions;
-        document.getElementById('continuousDays').textContent = uniqueDates.size;
+        document.getElementById('continuousDays').textContent = activeDays;
 
         // 更新最后更新时间
         if (this.allRecords.length > 0) {
@@ -340,5 +567,78 @@ class LeetCodeApp {
     }
 }
 
-// 初始化应用
-const app = new LeetCodeApp();
+/**
+ * 共享外壳页：按地址中的 #<页面名> 加载 q/<页面名>.html 片段
+ */
+class QuestionPage {
+    constructor() {
+        this.difficultyMap = {
+            'easy': '简单',
+            'medium': '中等',
+            'hard': '困难'
+        };
+        window.addEventListener('hashchange', () => this.load());
+        this.load();
+    }
+
+    async load() {
+        const pageId = decodeURIComponent(window.location.hash.slice(1));
+        const content = document.getElementById('questionContent');
+
+        if (!/^\d{8}_\d{6}_q\d+$/.test(pageId)) {
+            this.showError('题目不存在');
+            return;
+        }
+
+        try {
+            const response = await fetch(`q/${pageId}.html`);
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            const template = document.createElement('template');
+            template.innerHTML = await response.text();
+            const article = template.content.querySelector('article');
+            if (!article) {
+                throw new Error('片段格式错误');
+            }
+            const question = article.dataset;
+
+            document.title = `${question.number}. ${question.title} - LeetCode`;
+            document.getElementById('questionTitle').textContent = `${question.number}. ${question.title}`;
+            document.getElementById('pageTime').textContent = question.date;
+
+            const badge = document.getElementById('questionDifficulty');
+            badge.className = `difficulty-badge difficulty-${question.difficulty}`;
+            badge.textContent = this.difficultyMap[question.difficulty] || '未知';
+            badge.style.display = '';
+
+            const link = document.getElementById('questionLink');
+            if (question.url) {
+                link.href = question.url;
+                link.style.display = '';
+            } else {
+                link.style.display = 'none';
+            }
+
+            content.replaceChildren(...article.childNodes);
+            window.scrollTo(0, 0);
+        } catch (error) {
+            console.error('加载题目失败:', error);
+            this.showError('题目不存在');
+        }
+    }
+
+    showError(message) {
+        document.title = `${message} - LeetCode`;
+        document.getElementById('questionTitle').textContent = message;
+        document.getElementById('questionContent').innerHTML = `
+            <div class="empty-state">
+                <div class="empty-state-text">${message}</div>
+                <div class="empty-state-hint">请返回题目列表重新选择</div>
+            </div>
+        `;
+    }
+}
+
+// 初始化应用（外壳页和首页共用同一个脚本）
+const app = document.body.dataset.page === 'question' ? new QuestionPage() : new LeetCodeApp();
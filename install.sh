@@ -61,7 +61,7 @@ echo ""
 echo "定时任务将在每天下午 16:15 自动运行"
 echo ""
 echo "常用命令:"
-echo "  手动运行: python3 $SCRIPT_DIR/leetcode_daily.py"
+echo "  手动运行: cd $SCRIPT_DIR && python3 -m leetcode_daily"
 echo "  立即测试: launchctl start com.leetcode.daily"
 echo "  查看状态: launchctl list | grep leetcode"
 echo "  查看日志: tail -f $SCRIPT_DIR/logs/output.log"
@@ -5,33 +5,60 @@ LeetCode 每日题目获取脚本
 支持 DeepSeek AI 解答生成
 """
 
-import requests
+import argparse
+import hashlib
+import importlib
 import json
 import os
 import random
 import re
+import shutil
+import signal
 import subprocess
+import sys
+import threading
 import time
-from datetime import datetime
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from html import escape
+from html.parser import HTMLParser
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
+from urllib.parse import urlsplit
 
-try:
-    import markdown2
-    MARKDOWN2_AVAILABLE = True
-except ImportError:
-    MARKDOWN2_AVAILABLE = False
-    print(f"[info:{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 警告: markdown2 未安装，HTML 生成功能将被禁用")
-    print(f"[info:{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 安装命令: pip3 install markdown2")
+class LazyModule:
+    """按需导入的模块代理：首次访问属性时才真正导入
+
+    requests、asyncio、sqlite3、concurrent.futures 等模块导入较慢，而 --help、build 等命令并不需要它们；
+    用代理替代模块级导入，脚本启动时只加载标准库中的轻量模块。
+    """
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+requests = LazyModule('requests')
+asyncio = LazyModule('asyncio')
+sqlite3 = LazyModule('sqlite3')
+futures = LazyModule('concurrent.futures')
+gzip = LazyModule('gzip')
+
+# 启动耗时预算（毫秒），由 `benchmark.py --startup` 检查
+STARTUP_BUDGET_MS = 100
 
 def log_info(message: str):
     """输出带时间戳的日志"""
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     print(f"[info:{timestamp}] {message}")
 
-def load_config():
-    """加载配置文件"""
-    config_file = os.path.join(os.path.dirname(__file__), 'config.json')
+def load_config(config_file: Optional[str] = None):
+    """加载配置文件（默认读取脚本目录下的 config.json）"""
+    config_file = config_file or os.path.join(os.path.dirname(__file__), 'config.json')
     try:
         with open(config_file, 'r', encoding='utf-8') as f:
             return json.load(f)
@@ -39,8 +66,26 @@ def load_config():
         log_info(f"❌ 加载配置文件失败: {e}")
         return None
 
+@lru_cache(maxsize=None)
+def load_markdown2():
+    """首次生成 HTML 时导入 markdown2；未安装时只提示一次并返回 None"""
+    try:
+        import markdown2
+        return markdown2
+    except ImportError:
+        log_info("警告: markdown2 未安装，HTML 生成功能将被禁用")
+        log_info("安装命令: pip3 install markdown2")
+        return None
+
+@lru_cache(maxsize=None)
+def notification_available() -> bool:
+    """只在 macOS 且存在 osascript 时发送系统通知（结果缓存，每次运行只检测一次）"""
+    return sys.platform == 'darwin' and shutil.which('osascript') is not None
+
 def send_notification(title: str, message: str):
-    """发送 macOS 系统通知"""
+    """发送 macOS 系统通知（其他平台直接跳过）"""
+    if not notification_available():
+        return
     try:
         script = f'''
         display notification "{message}" with title "{title}"
@@ -69,8 +114,9 @@ class ExecutionLogger:
         if not self.results:
             return
 
-        # 生成日志信息
-        failed_items = [f"第{r['index']}题" for r in self.results if not r['success']]
+        # 生成日志信息（并发处理时结果按完成顺序记录，这里按题目序号排序）
+        results = sorted(self.results, key=lambda r: r['index'])
+        failed_items = [f"第{r['index']}题" for r in results if not r['success']]
 
         if failed_items:
             log_msg = f"{self.date_str} {', '.join(failed_items)}失败\n"
@@ -84,43 +130,249 @@ class ExecutionLogger:
         except Exception as e:
             log_info(f"警告: 保存执行日志失败: {e}")
 
+class RunMetrics:
+    """运行阶段耗时指标
+
+    用 span() 为目录、详情、AI、保存、HTML、历史 JSON、git 等阶段计时，并记录所属题目、
+    重试次数和字节数。运行结束时把本次运行追加为 metrics 文件中的一行 JSON，
+    可选同时导出 Prometheus textfile（供 node_exporter 的 textfile collector 读取）。
+    """
+    _local = threading.local()
+
+    def __init__(self, config: Dict):
+        self.enabled = config.get('enabled', True)
+        self.metrics_file = config.get('file', 'metrics.jsonl')
+        self.prometheus_file = config.get('prometheus_textfile', '')
+        self.started_at = datetime.now()
+        self.spans = []
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage: str, question: Optional[str] = None, **fields):
+        """计时一个阶段；with 块内可直接修改返回的记录（例如设置 ok、bytes）"""
+        record = {'stage': stage}
+        if question is not None:
+            record['question'] = question
+        record.update({'retries': 0, 'bytes': 0}, **fields)
+        stack = self._local.__dict__.setdefault('stack', [])
+        stack.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException:
+            record['ok'] = False
+            raise
+        finally:
+            record.setdefault('ok', True)
+            record['ms'] = round((time.perf_counter() - start) * 1000, 1)
+            stack.pop()
+            with self._lock:
+                self.spans.append(record)
+
+    @classmethod
+    def current(cls) -> Optional[Dict]:
+        """当前线程正在计时的阶段记录"""
+        stack = getattr(cls._local, 'stack', None)
+        return stack[-1] if stack else None
+
+    @classmethod
+    def add(cls, field: str, value=1):
+        """累加当前阶段记录中的数值字段（不在计时中时忽略）"""
+        record = cls.current()
+        if record is not None:
+            record[field] = record.get(field, 0) + value
+
+    @classmethod
+    def annotate(cls, **fields):
+        """设置当前阶段记录中的字段（不在计时中时忽略）"""
+        record = cls.current()
+        if record is not None:
+            record.update(fields)
+
+    @classmethod
+    def record_response(cls, response, *args, **kwargs):
+        """requests 响应钩子：把响应大小和传输层重试次数计入当前阶段"""
+        record = cls.current()
+        if record is None:
+            return
+        if kwargs.get('stream'):
+            # 流式响应的正文由调用方边读边计入
+            size = int(response.headers.get('Content-Length') or 0)
+        else:
+            size = len(response.content)
+        record['bytes'] += size
+        record['retries'] += getattr(response, 'retry_count', 0)
+        if record.get('requests'):
+            record['retries'] += 1  # 调用方自行重发的请求
+        record['requests'] = record.get('requests', 0) + 1
+
+    def summarize(self) -> Dict[str, Dict]:
+        """按阶段汇总次数、失败数、耗时、重试和字节数"""
+        stages = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            stat = stages.setdefault(span['stage'], {
+                'count': 0, 'failed': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'retries': 0, 'bytes': 0
+            })
+            stat['count'] += 1
+            stat['failed'] += int(not span['ok'])
+            stat['total_ms'] = round(stat['total_ms'] + span['ms'], 1)
+            stat['max_ms'] = max(stat['max_ms'], span['ms'])
+            stat['retries'] += span['retries']
+            stat['bytes'] += span['bytes']
+        return stages
+
+    def save(self, **fields):
+        """追加本次运行的指标，并按配置导出 Prometheus textfile"""
+        if not self.enabled:
+            return
+        with self._lock:
+            spans = list(self.spans)
+        record = {
+            'started_at': self.started_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'duration_ms': round((time.perf_counter() - self._start) * 1000, 1),
+            **fields,
+            'stages': self.summarize(),
+            'spans': spans
+        }
+        try:
+            with open(self.metrics_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        except Exception as e:
+            log_info(f"警告: 保存运行指标失败: {e}")
+
+        if self.prometheus_file:
+            try:
+                self.write_prometheus(record)
+            except Exception as e:
+                log_info(f"警告: 导出 Prometheus 指标失败: {e}")
+
+    def write_prometheus(self, record: Dict):
+        """以 Prometheus 文本格式原子写入本次运行的汇总指标"""
+        lines = [
+            '# HELP leetcode_daily_run_duration_seconds 最近一次运行总耗时',
+            '# TYPE leetcode_daily_run_duration_seconds gauge',
+            f"leetcode_daily_run_duration_seconds {record['duration_ms'] / 1000:.3f}",
+            '# HELP leetcode_daily_last_run_timestamp_seconds 最近一次运行的开始时间',
+            '# TYPE leetcode_daily_last_run_timestamp_seconds gauge',
+            f"leetcode_daily_last_run_timestamp_seconds {int(self.started_at.timestamp())}",
+        ]
+        series = [
+            ('stage_duration_seconds', '各阶段累计耗时', lambda st: st['total_ms'] / 1000),
+            ('stage_max_duration_seconds', '各阶段单次最长耗时', lambda st: st['max_ms'] / 1000),
+            ('stage_count', '各阶段执行次数', lambda st: st['count']),
+            ('stage_failures', '各阶段失败次数', lambda st: st['failed']),
+            ('stage_retries', '各阶段重试次数', lambda st: st['retries']),
+            ('stage_bytes', '各阶段传输或写入的字节数', lambda st: st['bytes']),
+        ]
+        for name, help_text, value in series:
+            lines.append(f'# HELP leetcode_daily_{name} {help_text}')
+            lines.append(f'# TYPE leetcode_daily_{name} gauge')
+            for stage, stat in sorted(record['stages'].items()):
+                lines.append(f'leetcode_daily_{name}{{stage="{stage}"}} {value(stat):g}')
+
+        tmp_file = f"{self.prometheus_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_file, self.prometheus_file)
+
+    def log_summary(self):
+        """输出各阶段耗时"""
+        for stage, stat in self.summarize().items():
+            log_info(f"阶段耗时: {stage} {stat['count']} 次，共 {stat['total_ms'] / 1000:.1f} 秒，"
+                     f"最长 {stat['max_ms'] / 1000:.1f} 秒，重试 {stat['retries']} 次")
+
 class QuestionHistory:
-    """题目历史记录管理"""
-    def __init__(self, history_file: str):
+    """题目历史记录管理
+
+    内存中用集合做 O(1) 查重；新增题目只追加写入 `<history_file>.journal`，
+    日志累积到一定条数后再合并回 question_history.json（格式不变）。
+    """
+    def __init__(self, history_file: str, compact_threshold: int = 50):
         self.history_file = history_file
+        self.journal_file = f"{history_file}.journal"
+        self.compact_threshold = compact_threshold
+        self.journal_entries = 0
         self.history = self.load()
+        self._index = set(self.history)
 
     def load(self) -> List[str]:
-        """加载历史记录"""
+        """加载历史记录，并回放尚未合并的追加日志"""
+        history = []
         if os.path.exists(self.history_file):
             try:
                 with open(self.history_file, 'r', encoding='utf-8') as f:
                     data = json.load(f)
-                    return data.get('selected_questions') or []
+                    history = data.get('selected_questions') or []
             except Exception as e:
                 log_info(f"警告: 加载历史记录失败: {e}")
-        return []
+
+        if os.path.exists(self.journal_file):
+            seen = set(history)
+            try:
+                with open(self.journal_file, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        question_id = line.strip()
+                        if not question_id:
+                            continue
+                        self.journal_entries += 1
+                        if question_id not in seen:
+                            seen.add(question_id)
+                            history.append(question_id)
+            except Exception as e:
+                log_info(f"警告: 加载历史记录追加日志失败: {e}")
+        return history
 
     def save(self):
-        """保存历史记录"""
+        """保存完整历史记录（合并追加日志）"""
         try:
-            with open(self.history_file, 'w', encoding='utf-8') as f:
+            tmp_file = f"{self.history_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
                 json.dump({
                     'selected_questions': self.history,
                     'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                 }, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.history_file)
         except Exception as e:
             log_info(f"警告: 保存历史记录失败: {e}")
+            return
+
+        # 完整文件落盘后再清空追加日志，中途崩溃时回放会自动去重
+        try:
+            if os.path.exists(self.journal_file):
+                os.remove(self.journal_file)
+            self.journal_entries = 0
+        except Exception as e:
+            log_info(f"警告: 清理历史记录追加日志失败: {e}")
+
+    def compact(self):
+        """将追加日志合并回历史记录文件"""
+        if self.journal_entries:
+            self.save()
 
     def add(self, question_id: str):
-        """添加题目到历史记录"""
-        if question_id not in self.history:
-            self.history.append(question_id)
+        """添加题目到历史记录（追加写入日志）"""
+        if question_id in self._index:
+            return
+        self._index.add(question_id)
+        self.history.append(question_id)
+        try:
+            with open(self.journal_file, 'a', encoding='utf-8') as f:
+                f.write(f"{question_id}\n")
+            self.journal_entries += 1
+        except Exception as e:
+            log_info(f"警告: 写入历史记录追加日志失败: {e}")
             self.save()
+            return
+
+        if self.journal_entries >= self.compact_threshold:
+            self.compact()
 
     def contains(self, question_id: str) -> bool:
         """检查题目是否已存在"""
-        return question_id in self.history
+        return question_id in self._index
 
     def get_stats(self) -> Dict:
         """获取统计信息"""
@@ -128,12 +380,629 @@ class QuestionHistory:
             'total_selected': len(self.history)
         }
 
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 响应头（秒数或 HTTP 日期），返回需要等待的秒数"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    from email.utils import parsedate_to_datetime
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+class HostRateLimiter:
+    """单个主机的自适应令牌桶
+
+    每次请求前取一个令牌；收到 429 时速率减半，并在 Retry-After 指定的时间内
+    暂停发放令牌；请求成功后速率逐步回升，直到 max_rate。
+    """
+    def __init__(self, host: str, config: Dict):
+        self.host = host
+        self.max_rate = config.get('max_rate', config.get('rate', 5.0))
+        self.min_rate = config.get('min_rate', 0.2)
+        self.rate = min(config.get('rate', 5.0), self.max_rate)
+        self.burst = max(1.0, config.get('burst', self.rate))
+        self.increase = config.get('increase', self.max_rate / 20)
+        self.tokens = self.burst
+        self.blocked_until = 0.0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.throttled = 0
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """阻塞直到取得一个令牌"""
+        with self._cond:
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    delay = self.blocked_until - now
+                    if delay <= 0:
+                        if self.tokens >= 1:
+                            self.tokens -= 1
+                            return
+                        delay = (1 - self.tokens) / self.rate
+                    self._cond.wait(delay)
+            finally:
+                self.waiting -= 1
+
+    def on_success(self):
+        """请求成功：加性恢复速率"""
+        with self._cond:
+            if self.rate < self.max_rate:
+                self._refill(time.monotonic())
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttled(self, retry_after: Optional[float]):
+        """收到 429：速率减半，并按 Retry-After 暂停"""
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            self.throttled += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+            delay = retry_after if retry_after is not None else 1 / self.rate
+            self.blocked_until = max(self.blocked_until, now + delay)
+            rate, waiting = self.rate, self.waiting
+            self._cond.notify_all()
+        log_info(f"  ⚠ {self.host} 触发限流 (429)，等待 {delay:.1f} 秒，速率降至 {rate:.2f} 次/秒，排队 {waiting} 个请求")
+
+    def get_stats(self) -> Dict:
+        with self._cond:
+            return {
+                'rate': self.rate,
+                'waiting': self.waiting,
+                'peak_waiting': self.peak_waiting,
+                'throttled': self.throttled
+            }
+
+@lru_cache(maxsize=None)
+def http_transport_classes():
+    """定义依赖 requests / urllib3 的传输层类（首次创建 Session 时才导入 requests）"""
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    class TransportRetry(Retry):
+        """传输层重试：429 交给限流器处理，不在这里按 Retry-After 重试"""
+        RETRY_AFTER_STATUS_CODES = frozenset({413, 503})
+
+    class RateLimitedAdapter(HTTPAdapter):
+        """每次发送前从主机令牌桶取令牌，并在适配器层处理 429 重试"""
+        def __init__(self, limiter: HostRateLimiter, max_throttle_retries: int, **kwargs):
+            self.limiter = limiter
+            self.max_throttle_retries = max_throttle_retries
+            super().__init__(**kwargs)
+
+        def send(self, request, **kwargs):
+            attempt = 0
+            retried = 0
+            while True:
+                self.limiter.acquire()
+                response = super().send(request, **kwargs)
+                # 传输层（urllib3）已经重试过的次数
+                history = getattr(getattr(response.raw, 'retries', None), 'history', None) or ()
+                retried += len(history)
+                response.retry_count = retried
+                if response.status_code != 429:
+                    if response.status_code < 400:
+                        self.limiter.on_success()
+                    return response
+                self.limiter.on_throttled(parse_retry_after(response.headers.get('Retry-After')))
+                if attempt >= self.max_throttle_retries:
+                    return response
+                attempt += 1
+                retried += 1
+                response.close()
+
+    return TransportRetry, RateLimitedAdapter
+
+class HTTPSessionPool:
+    """HTTP 连接池（每个主机和重试次数一个 Session，keep-alive + 令牌桶限流 + 传输层重试）"""
+    def __init__(self, config: Dict):
+        self.pool_maxsize = config.get('pool_maxsize', 10)
+        self.retries = config.get('retries', 3)
+        self.backoff_factor = config.get('backoff_factor', 1.0)
+        # 429 由限流器处理，这里只重试服务端错误
+        self.status_forcelist = config.get('status_forcelist', [500, 502, 503, 504])
+        self.rate_limits = config.get('rate_limits', {})
+        self._sessions = {}
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, host: str) -> HostRateLimiter:
+        """获取主机的限流器（按 rate_limits 中的主机配置，未配置时使用 default）"""
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limit_config = self.rate_limits.get(host, self.rate_limits.get('default', {}))
+                limiter = self._limiters[host] = HostRateLimiter(host, limit_config)
+        return limiter
+
+    def session(self, url: str, retries: Optional[int] = None) -> 'requests.Session':
+        """获取目标主机的 Session（按主机和重试次数区分，首次调用时创建）"""
+        host = urlsplit(url).netloc
+        limiter = self.limiter(host)
+        retries = self.retries if retries is None else retries
+        with self._lock:
+            session = self._sessions.get((host, retries))
+            if session is None:
+                TransportRetry, RateLimitedAdapter = http_transport_classes()
+                retry = TransportRetry(
+                    total=retries,
+                    backoff_factor=self.backoff_factor,
+                    status_forcelist=self.status_forcelist,
+                    allowed_methods=None,  # GraphQL 和 chat/completions 都是 POST，同样需要重试
+                    respect_retry_after_header=True,
+                    raise_on_status=False
+                )
+                adapter = RateLimitedAdapter(
+                    limiter,
+                    retries,
+                    pool_connections=1,
+                    pool_maxsize=self.pool_maxsize,
+                    max_retries=retry
+                )
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.hooks['response'].append(RunMetrics.record_response)
+                self._sessions[(host, retries)] = session
+        return session
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """按主机统计请求数和实际建立的连接数"""
+        stats = {}
+        with self._lock:
+            sessions = dict(self._sessions)
+        for (host, _), session in sessions.items():
+            if host not in stats:
+                stats[host] = {'requests': 0, 'connections': 0}
+                stats[host].update(self.limiter(host).get_stats())
+            # http:// 和 https:// 挂载的是同一个 adapter，去重后再统计
+            adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+            for adapter in adapters.values():
+                pools = adapter.poolmanager.pools
+                for key in list(pools.keys()):
+                    pool = pools.get(key)
+                    if pool is not None:
+                        stats[host]['requests'] += pool.num_requests
+                        stats[host]['connections'] += pool.num_connections
+        return stats
+
+    def log_stats(self):
+        """输出连接复用和限流统计"""
+        for host, stat in self.get_stats().items():
+            if stat['requests']:
+                reused = stat['requests'] - stat['connections']
+                log_info(f"连接复用: {host} 共 {stat['requests']} 次请求，新建 {stat['connections']} 个连接，复用 {reused} 次")
+                log_info(f"限流状态: {host} 当前速率 {stat['rate']:.2f} 次/秒，429 {stat['throttled']} 次，"
+                         f"排队 {stat['waiting']} 个（峰值 {stat['peak_waiting']}）")
+
+    def close(self):
+        """关闭所有 Session"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+class AISolutionCache:
+    """AI 解答磁盘缓存
+
+    以 (provider, model, 完整提示词) 的哈希为键，每条解答保存为一个 JSON 文件；
+    命中时更新文件 mtime，按条数和总大小淘汰最久未使用的条目；超过保存期限的条目不再命中，
+    超过同样期限未使用的条目在淘汰时删除。
+    """
+    def __init__(self, config: Dict):
+        self.enabled = config.get('enabled', True)
+        self.cache_dir = Path(config.get('cache_dir', '.ai_cache'))
+        self.max_entries = config.get('max_entries', 500)
+        self.max_bytes = config.get('max_bytes', 50 * 1024 * 1024)
+        self.max_age_days = config.get('max_age_days', 90)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(provider: str, model: str, prompt: str) -> str:
+        """生成缓存键"""
+        raw = json.dumps([provider, model, prompt], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _expired(self, created_at: float) -> bool:
+        return bool(self.max_age_days) and time.time() - created_at > self.max_age_days * 86400
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存的解答"""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        solution = None
+        try:
+            if path.exists():
+                with open(path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+                if not self._expired(entry.get('created_at', 0)):
+                    solution = entry.get('solution')
+            if solution:
+                # 记录最近访问时间，淘汰时按 mtime 保留最近用过的条目
+                os.utime(path)
+        except Exception as e:
+            log_info(f"  ⚠ 读取 AI 解答缓存失败: {e}")
+        with self._lock:
+            if solution:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return solution
+
+    def put(self, key: str, solution: str, provider: str, model: str):
+        """保存解答"""
+        if not self.enabled or not solution:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_file = self._path(key).with_suffix('.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'provider': provider,
+                    'model': model,
+                    'created_at': time.time(),
+                    'solution': solution
+                }, f, ensure_ascii=False)
+            os.replace(tmp_file, self._path(key))
+        except Exception as e:
+            log_info(f"  ⚠ 保存 AI 解答缓存失败: {e}")
+
+    def evict(self) -> int:
+        """淘汰过期条目，并按最近使用时间保留不超过条数和大小上限的条目"""
+        if not self.enabled or not self.cache_dir.exists():
+            return 0
+        entries = []
+        for path in self.cache_dir.glob('*.json'):
+            try:
+                stat = path.stat()
+                entries.append((stat.st_mtime, stat.st_size, path))
+            except OSError:
+                continue
+
+        entries.sort(reverse=True)
+        removed = 0
+        kept = total_bytes = 0
+        for mtime, size, path in entries:
+            if (self._expired(mtime)
+                    or (self.max_entries and kept >= self.max_entries)
+                    or (self.max_bytes and total_bytes + size > self.max_bytes)):
+                try:
+                    path.unlink()
+                    removed += 1
+                except OSError:
+                    pass
+                continue
+            kept += 1
+            total_bytes += size
+        return removed
+
+    def log_summary(self):
+        """输出命中统计"""
+        if not self.enabled or not (self.hits or self.misses):
+            return
+        total = self.hits + self.misses
+        log_info(f"AI 解答缓存: 命中 {self.hits}/{total} 次，未命中 {self.misses} 次")
+
+class ClaudeCLIPool:
+    """Claude CLI 子进程池
+
+    在后台线程中运行一个 asyncio 事件循环，用信号量限制同时运行的 CLI 进程数；
+    调用方线程通过 run() 同步等待结果。每次调用有独立超时，超时或关闭时会
+    终止仍在运行的子进程。
+    """
+    def __init__(self, concurrency: int = 2, timeout: float = 300):
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self._loop = None
+        self._thread = None
+        self._semaphore = None
+        self._procs = set()
+        self._futures = set()
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name='claude-cli-pool', daemon=True
+                )
+                self._thread.start()
+        return self._loop
+
+    async def _run(self, args: List[str]) -> tuple:
+        # 在运行中的事件循环里按需创建信号量
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            proc = await asyncio.create_subprocess_exec(
+                *args,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            self._procs.add(proc)
+            try:
+                stdout, stderr = await asyncio.wait_for(proc.communicate(), self.timeout)
+            except asyncio.TimeoutError:
+                raise subprocess.TimeoutExpired(args, self.timeout)
+            finally:
+                # 超时或被取消时结束子进程
+                if proc.returncode is None:
+                    proc.kill()
+                    await proc.wait()
+                self._procs.discard(proc)
+        return (proc.returncode,
+                stdout.decode('utf-8', errors='replace'),
+                stderr.decode('utf-8', errors='replace'))
+
+    def run(self, args: List[str]) -> tuple:
+        """在池中执行命令，返回 (returncode, stdout, stderr)"""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._run(args), loop)
+        with self._lock:
+            self._futures.add(future)
+        try:
+            return future.result()
+        finally:
+            with self._lock:
+                self._futures.discard(future)
+
+    def shutdown(self):
+        """取消排队中的调用并终止仍在运行的 CLI 进程"""
+        with self._lock:
+            loop = self._loop
+            pending = list(self._futures)
+            self._loop = None
+            # 信号量绑定在即将停止的事件循环上，再次使用时在新循环中重新创建
+            self._semaphore = None
+        if loop is None:
+            return
+        for future in pending:
+            future.cancel()
+        if pending:
+            log_info(f"  ⚠ 已取消 {len(pending)} 个未完成的 Claude CLI 调用")
+
+        async def _drain():
+            for proc in list(self._procs):
+                if proc.returncode is None:
+                    proc.kill()
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            asyncio.run_coroutine_threadsafe(_drain(), loop).result(timeout=10)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout=5)
+
+class HTMLTextExtractor(HTMLParser):
+    """把题目描述 HTML 转换为纯文本：段落、列表项各占一行，保留 <pre> 中的换行，上标写作 ^，图片丢弃"""
+    BLOCK_TAGS = {'p', 'div', 'pre', 'ul', 'ol', 'table', 'tr', 'blockquote', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.pre = 0
+        self.lists = []  # 每层列表的当前序号，无序列表为 None
+
+    def newline(self):
+        if self.parts and not self.parts[-1].endswith('\n'):
+            self.parts.append('\n')
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.BLOCK_TAGS or tag == 'br':
+            self.newline()
+        if tag == 'pre':
+            self.pre += 1
+        elif tag in ('ul', 'ol'):
+            self.lists.append(0 if tag == 'ol' else None)
+        elif tag == 'li':
+            self.newline()
+            if self.lists and self.lists[-1] is not None:
+                self.lists[-1] += 1
+                self.parts.append(f"{self.lists[-1]}. ")
+        elif tag == 'sup':
+            self.parts.append('^')
+        elif tag == 'sub':
+            self.parts.append('_')
+        elif tag in ('td', 'th'):
+            self.parts.append(' ')
+
+    def handle_endtag(self, tag):
+        if tag == 'pre':
+            self.pre = max(0, self.pre - 1)
+        elif tag in ('ul', 'ol') and self.lists:
+            self.lists.pop()
+        if tag in self.BLOCK_TAGS or tag == 'li':
+            self.newline()
+
+    def handle_data(self, data):
+        data = data.replace('\xa0', ' ')
+        if not self.pre:
+            data = re.sub(r'\s+', ' ', data)
+            if not self.parts or self.parts[-1].endswith(('\n', '. ')):
+                data = data.lstrip()
+        if data:
+            self.parts.append(data)
+
+    def text(self) -> str:
+        lines = []
+        for line in ''.join(self.parts).split('\n'):
+            # 数据库题的字符画表格：去掉边框行，收紧单元格内的对齐空格
+            if re.fullmatch(r'\s*\+[-+]+\+\s*', line):
+                continue
+            if line.lstrip().startswith('|'):
+                line = re.sub(r' {2,}', ' ', line)
+            if line.strip():
+                lines.append(line.rstrip())
+        return '\n'.join(lines)
+
+class PromptCompactor:
+    """提示词压缩：把题目 HTML 整理为 描述 / 示例 / 提示（约束）/ 进阶 几部分的紧凑文本，
+    估算 token 数并在超出预算时按价值从低到高删减：
+    后面示例的解释 → 后面的示例 → 进阶 → 第一个示例的解释 → 第一个示例 → 按句截断描述。
+    约束条件始终完整保留。budget_tokens 为 0 时不删减。
+    """
+    EXAMPLE_RE = re.compile(r'^(示例|Example)\s*\d*\s*[:：]')
+    CONSTRAINTS_RE = re.compile(r'^(提示|约束|Constraints)\s*[:：]')
+    FOLLOW_UP_RE = re.compile(r'^(进阶|Follow[- ]?up)\s*[:：]?', re.IGNORECASE)
+    EXPLANATION_RE = re.compile(r'^(解释|Explanation)\s*[:：]', re.MULTILINE)
+
+    def __init__(self, budget_tokens: int = 800):
+        self.budget_tokens = budget_tokens
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """粗略估算 token 数：汉字和标点各约 1 个，英文单词和连续的同一符号每 4 个字符约 1 个，数字每 3 位约 1 个
+
+        空白和换行多与相邻的词合并，不单独计数。
+        """
+        tokens = 0
+        for match in re.finditer(r'[A-Za-z]+|\d+|([!-/:-@\[-`{-~])\1*|\S', text):
+            piece = match.group(0)
+            if piece.isdigit():
+                tokens += (len(piece) + 2) // 3
+            elif piece.isascii():
+                tokens += (len(piece) + 3) // 4
+            else:
+                tokens += 1
+        return tokens
+
+    @staticmethod
+    def html_to_text(html: str) -> str:
+        extractor = HTMLTextExtractor()
+        extractor.feed(html)
+        extractor.close()
+        return extractor.text()
+
+    def split_sections(self, text: str) -> Dict:
+        """按 "示例 N：" / "提示：" / "进阶：" 标题拆分为各部分"""
+        sections = {'statement': [], 'examples': [], 'constraints': [], 'follow_up': []}
+        current = sections['statement']
+        for line in text.split('\n'):
+            stripped = line.strip()
+            if self.EXAMPLE_RE.match(stripped):
+                sections['examples'].append([])
+                current = sections['examples'][-1]
+            elif self.CONSTRAINTS_RE.match(stripped):
+                current = sections['constraints']
+            elif self.FOLLOW_UP_RE.match(stripped):
+                current = sections['follow_up']
+            current.append(line)
+        return {
+            'statement': '\n'.join(sections['statement']),
+            'examples': ['\n'.join(lines) for lines in sections['examples']],
+            'constraints': '\n'.join(sections['constraints']),
+            'follow_up': '\n'.join(sections['follow_up']),
+        }
+
+    @staticmethod
+    def join_sections(sections: Dict) -> str:
+        parts = [sections['statement'], *sections['examples'], sections['constraints'], sections['follow_up']]
+        return '\n\n'.join(part for part in parts if part)
+
+    def truncate_statement(self, statement: str, budget: int) -> str:
+        """按句截断描述，至少保留第一句（没有删减时原样返回）"""
+        if not statement:
+            return statement
+        sentences = re.findall(r'[^。！？!?\n]*(?:[。！？!?]|\n|$)', statement)
+        kept, used = [], 0
+        for sentence in sentences:
+            cost = self.estimate_tokens(sentence)
+            if kept and used + cost > budget:
+                break
+            kept.append(sentence)
+            used += cost
+        if len(kept) == len(sentences):
+            return statement
+        return ''.join(kept).rstrip() + '……'
+
+    def compact(self, html: str) -> tuple:
+        """返回 (压缩后的题目文本, 报告)
+
+        报告中 original_tokens 为去除标签后完整描述的估算 token 数，tokens 为压缩后的估算值，
+        trimmed 列出为满足预算删减的部分。
+        """
+        original = re.sub(r'\s+', ' ', re.sub(r'<[^>]+>', '', html)).strip()
+        sections = self.split_sections(self.html_to_text(html))
+        trimmed = []
+
+        def over_budget() -> bool:
+            return bool(self.budget_tokens) and self.estimate_tokens(self.join_sections(sections)) > self.budget_tokens
+
+        examples = sections['examples']
+        steps = []
+        for k in range(len(examples) - 1, 0, -1):
+            steps.append(('explanation', k))
+        for k in range(len(examples) - 1, 0, -1):
+            steps.append(('example', k))
+        steps.append(('follow_up', None))
+        if examples:
+            steps += [('explanation', 0), ('example', 0)]
+        for kind, k in steps:
+            if not over_budget():
+                break
+            if kind == 'explanation':
+                match = self.EXPLANATION_RE.search(examples[k])
+                if match:
+                    examples[k] = examples[k][:match.start()].rstrip()
+                    trimmed.append(f"示例 {k + 1} 解释")
+            elif kind == 'example':
+                examples.pop(k)
+                trimmed.append(f"示例 {k + 1}")
+            elif sections['follow_up']:
+                sections['follow_up'] = ''
+                trimmed.append("进阶")
+
+        if over_budget():
+            rest = self.estimate_tokens(self.join_sections(dict(sections, statement='')))
+            statement = self.truncate_statement(sections['statement'], self.budget_tokens - rest)
+            if statement != sections['statement']:
+                sections['statement'] = statement
+                trimmed.append("描述截断")
+
+        text = self.join_sections(sections)
+        return text, {
+            'original_tokens': self.estimate_tokens(original),
+            'tokens': self.estimate_tokens(text),
+            'trimmed': trimmed,
+        }
+
 class AISolutionGenerator:
     """AI 解答生成器（支持 DeepSeek API 和本地 Claude Code CLI）"""
-    def __init__(self, config: Dict):
+    def __init__(self, config: Dict, http_pool: Optional[HTTPSessionPool] = None,
+                 cache: Optional[AISolutionCache] = None):
         self.enabled = config.get('enabled', False)
         self.mode = config.get('mode', 'deepseek')  # 'deepseek' 或 'claude_cli'
         self.prompt_template = config.get('prompt_template', '')
+        self.compactor = PromptCompactor(config.get('prompt_budget_tokens', 800))
         self.max_retries = config.get('max_retries', 3)
 
         # DeepSeek API 配置
@@ -141,12 +1010,24 @@ class AISolutionGenerator:
         self.base_url = config.get('base_url', 'https://api.deepseek.com/v1')
         self.model = config.get('model', 'deepseek-chat')
         self.timeout = config.get('timeout', 300)
+        self.stream = config.get('stream', False)
+        self.idle_timeout = config.get('idle_timeout', 60)  # 流式模式下两次数据之间允许的最长间隔
 
         # Claude CLI 配置
         self.claude_cli = config.get('claude_cli', 'claude')
+        self.cli_pool = ClaudeCLIPool(config.get('claude_cli_concurrency', 2), self.timeout)
+        self._available = None
+
+        self.http_pool = http_pool or HTTPSessionPool({})
+        self.cache = cache or AISolutionCache({'enabled': False})
 
     def is_available(self) -> bool:
-        """检查 AI 生成器是否可用"""
+        """检查 AI 生成器是否可用（结果只探测一次并缓存）"""
+        if self._available is None:
+            self._available = self._probe()
+        return self._available
+
+    def _probe(self) -> bool:
         if not self.enabled:
             return False
         if self.mode == 'claude_cli':
@@ -165,56 +1046,85 @@ class AISolutionGenerator:
                 return False
             return True
 
-    def generate_solution(self, question: Dict) -> Optional[str]:
-        """生成题目解答（带重试机制）"""
+    def close(self):
+        """释放 CLI 子进程池"""
+        self.cli_pool.shutdown()
+
+    def generate_solution(self, question: Dict, partial_file: Optional[str] = None) -> Optional[str]:
+        """生成题目解答（带重试机制）
+
+        partial_file: 流式模式下实时写入已生成内容的文件
+        """
         if not self.is_available():
             return None
 
-        # 清理 HTML 标签（处理 content 可能为 None 的情况）
-        raw_content = question.get('content') or ''
-        content = re.sub(r'<[^>]+>', '', raw_content)
-        content = re.sub(r'\s+', ' ', content).strip()
+        # 题目 HTML 整理为紧凑文本并按 token 预算删减（处理 content 可能为 None 的情况）
+        content, report = self.compactor.compact(question.get('content') or '')
+        saved = report['original_tokens'] - report['tokens']
+        log_info(f"  提示词 {question.get('questionFrontendId', '')}: 题目约 {report['tokens']} tokens"
+                 f"（完整描述约 {report['original_tokens']}，节省 {saved}"
+                 + (f"，删减: {', '.join(report['trimmed'])}" if report['trimmed'] else '') + "）")
+        RunMetrics.annotate(prompt_tokens=report['tokens'], prompt_tokens_saved=saved,
+                            prompt_trimmed=report['trimmed'])
 
         # 填充提示词
         prompt = self.prompt_template.format(
             title=question.get('title', ''),
             difficulty=question.get('difficulty', ''),
-            content=content[:2000]  # 限制长度
+            content=content
         )
 
+        # 相同 provider / 模型 / 提示词直接复用已生成的解答
+        model = self.claude_cli if self.mode == 'claude_cli' else self.model
+        cache_key = self.cache.make_key(self.mode, model, prompt)
+        solution = self.cache.get(cache_key)
+        if solution:
+            log_info(f"  ✓ 命中 AI 解答缓存")
+            return solution
+
         # 根据模式选择生成方式
         if self.mode == 'claude_cli':
-            return self._generate_via_claude_cli(prompt)
+            solution = self._generate_via_claude_cli(prompt)
+        elif self.stream:
+            solution = self._generate_via_deepseek_stream(prompt, partial_file)
         else:
-            return self._generate_via_deepseek(prompt)
+            solution = self._generate_via_deepseek(prompt)
+
+        if solution:
+            self.cache.put(cache_key, solution, self.mode, model)
+        return solution
 
     def _generate_via_claude_cli(self, prompt: str) -> Optional[str]:
-        """通过本地 Claude Code CLI 生成解答"""
+        """通过本地 Claude Code CLI 生成解答（在子进程池中并发执行）"""
         for attempt in range(self.max_retries):
             try:
                 log_info(f"  调用 Claude CLI... (尝试 {attempt + 1}/{self.max_retries})")
-                result = subprocess.run(
+                returncode, stdout, _ = self.cli_pool.run(
                     [self.claude_cli, '-p', '--bare', '--dangerously-skip-permissions',
-                     '--output-format', 'text', prompt],
-                    capture_output=True, text=True,
-                    timeout=120  # bare 模式更快，120 秒足够
+                     '--output-format', 'text', prompt]
                 )
-                if result.returncode == 0 and result.stdout.strip():
-                    return result.stdout.strip()
+                if returncode == 0 and stdout.strip():
+                    RunMetrics.add('bytes', len(stdout.encode('utf-8')))
+                    return stdout.strip()
                 else:
-                    log_info(f"  ⚠ Claude CLI 返回异常 (exit code {result.returncode})")
+                    log_info(f"  ⚠ Claude CLI 返回异常 (exit code {returncode})")
                     if attempt < self.max_retries - 1:
+                        RunMetrics.add('retries')
                         time.sleep(2)
                     else:
                         log_info(f"  ❌ Claude CLI 调用失败，已重试 {self.max_retries} 次")
                         return None
             except subprocess.TimeoutExpired:
-                log_info(f"  ⚠ Claude CLI 超时（300秒），重试...")
+                log_info(f"  ⚠ Claude CLI 超时（{self.timeout}秒），重试...")
                 if attempt < self.max_retries - 1:
+                    RunMetrics.add('retries')
                     time.sleep(2)
                 else:
                     log_info(f"  ❌ Claude CLI 超时，已重试 {self.max_retries} 次，放弃")
                     return None
+            except futures.CancelledError:
+                log_info(f"  ⚠ Claude CLI 调用已取消")
+                return None
             except Exception as e:
                 log_info(f"  ❌ Claude CLI 调用失败: {e}")
                 return None
@@ -236,71 +1146,155 @@ class AISolutionGenerator:
             'max_tokens': 4000
         }
 
-        # 重试机制（指数退避）
+        # 429 由主机限流器按 Retry-After 等待后重试，5xx / 网络错误由连接池按指数退避重试
+        url = f'{self.base_url}/chat/completions'
+        session = self.http_pool.session(url, retries=max(self.max_retries - 1, 0))
+        try:
+            response = session.post(
+                url,
+                headers=headers,
+                json=payload,
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            data = response.json()
+
+            # 支持 OpenAI 标准格式和 dewu 格式
+            if 'choices' in data:
+                return data['choices'][0]['message']['content']
+            elif 'content' in data and isinstance(data['content'], list):
+                # dewu 格式: content 是数组
+                text_parts = []
+                for item in data['content']:
+                    if item.get('type') == 'text':
+                        text_parts.append(item.get('text', ''))
+                return '\n'.join(text_parts) if text_parts else None
+            else:
+                log_info(f"  ⚠ 未知的 API 响应格式")
+                return None
+
+        except requests.exceptions.Timeout:
+            log_info(f"  ❌ DeepSeek API 超时（超过 {self.timeout} 秒），已重试 {self.max_retries} 次，放弃")
+            return None
+
+        except requests.exceptions.HTTPError as e:
+            status_code = e.response.status_code if e.response is not None else None
+            if status_code == 429:
+                log_info(f"  ❌ 触发速率限制，已重试 {self.max_retries} 次，放弃")
+            elif status_code in [500, 502, 503, 504]:
+                log_info(f"  ❌ 服务器错误 ({status_code})，已重试 {self.max_retries} 次，放弃")
+            else:
+                log_info(f"  ❌ DeepSeek API 调用失败 (HTTP {status_code}): {e}")
+            return None
+
+        except requests.exceptions.ConnectionError as e:
+            log_info(f"  ❌ 网络连接错误，已重试 {self.max_retries} 次，放弃: {e}")
+            return None
+
+        except Exception as e:
+            log_info(f"  ❌ DeepSeek API 调用失败（未知错误）: {e}")
+            return None
+
+    @staticmethod
+    def open_partial(partial_file: Optional[str]):
+        """打开流式输出的中间文件（目录不存在时先创建）；无法写入时只提示，解答仍在内存中接收"""
+        if not partial_file:
+            return nullcontext()
+        try:
+            os.makedirs(os.path.dirname(partial_file) or '.', exist_ok=True)
+            return open(partial_file, 'w', encoding='utf-8')
+        except OSError as e:
+            log_info(f"  ⚠ 无法写入中间文件 {partial_file}: {e}")
+            return nullcontext()
+
+    def _generate_via_deepseek_stream(self, prompt: str, partial_file: Optional[str] = None) -> Optional[str]:
+        """通过 DeepSeek API 流式生成解答（SSE）
+
+        使用空闲超时代替总超时：只要持续收到 token 就不会被判定为超时，
+        只有连续 idle_timeout 秒没有数据时才中断重试。
+        """
+        headers = {
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream'
+        }
+
+        payload = {
+            'model': self.model,
+            'messages': [
+                {'role': 'user', 'content': prompt}
+            ],
+            'temperature': 0.7,
+            'max_tokens': 4000,
+            'stream': True
+        }
+
+        url = f'{self.base_url}/chat/completions'
+        session = self.http_pool.session(url, retries=max(self.max_retries - 1, 0))
+
+        # 建立连接阶段的 429 / 5xx 由连接池重试；这里只处理传输中途停顿的情况
         for attempt in range(self.max_retries):
+            parts = []
+            start = time.time()
+            first_token = None
             try:
-                response = requests.post(
-                    f'{self.base_url}/chat/completions',
+                response = session.post(
+                    url,
                     headers=headers,
                     json=payload,
-                    timeout=self.timeout
+                    stream=True,
+                    timeout=(10, self.idle_timeout)
                 )
                 response.raise_for_status()
-                data = response.json()
-
-                # 支持 OpenAI 标准格式和 dewu 格式
-                if 'choices' in data:
-                    return data['choices'][0]['message']['content']
-                elif 'content' in data and isinstance(data['content'], list):
-                    # dewu 格式: content 是数组
-                    text_parts = []
-                    for item in data['content']:
-                        if item.get('type') == 'text':
-                            text_parts.append(item.get('text', ''))
-                    return '\n'.join(text_parts) if text_parts else None
-                else:
-                    log_info(f"  ⚠ 未知的 API 响应格式")
-                    return None
 
-            except requests.exceptions.Timeout:
-                wait_time = 2 ** attempt
-                if attempt < self.max_retries - 1:
-                    log_info(f"  ⚠ DeepSeek API 超时（超过 {self.timeout} 秒），{wait_time}秒后重试... ({attempt + 1}/{self.max_retries})")
-                    time.sleep(wait_time)
-                else:
-                    log_info(f"  ❌ DeepSeek API 超时，已重试 {self.max_retries} 次，放弃")
+                with response, self.open_partial(partial_file) as partial:
+                    # chunk_size=None：收到多少数据就处理多少，不等缓冲区填满
+                    for line in response.iter_lines(chunk_size=None):
+                        RunMetrics.add('bytes', len(line) + 1)
+                        # SSE 响应通常不带 charset，按 UTF-8 自行解码
+                        line = line.decode('utf-8', errors='replace').strip()
+                        if not line.startswith('data:'):
+                            continue
+                        data = line[5:].strip()
+                        if data == '[DONE]':
+                            break
+
+                        chunk = json.loads(data)
+                        choices = chunk.get('choices') or [{}]
+                        delta = (choices[0].get('delta') or {}).get('content') or ''
+                        if not delta:
+                            continue
+
+                        if first_token is None:
+                            first_token = time.time() - start
+                            log_info(f"  首个 token 用时 {first_token:.1f} 秒")
+                            RunMetrics.annotate(ttft_ms=round(first_token * 1000, 1))
+                        parts.append(delta)
+                        if partial:
+                            partial.write(delta)
+                            partial.flush()
+
+                solution = ''.join(parts)
+                if not solution:
+                    log_info(f"  ⚠ DeepSeek API 流式响应为空")
                     return None
+                log_info(f"  流式生成完成：{len(solution)} 字符，用时 {time.time() - start:.1f} 秒")
+                return solution
 
             except requests.exceptions.HTTPError as e:
-                status_code = e.response.status_code if e.response else None
-                if status_code == 429:  # Rate limit
-                    wait_time = 2 ** attempt
-                    if attempt < self.max_retries - 1:
-                        log_info(f"  ⚠ 触发速率限制，{wait_time}秒后重试... ({attempt + 1}/{self.max_retries})")
-                        time.sleep(wait_time)
-                    else:
-                        log_info(f"  ❌ 触发速率限制，已重试 {self.max_retries} 次，放弃")
-                        return None
-                elif status_code in [500, 502, 503, 504]:
-                    wait_time = 2 ** attempt
-                    if attempt < self.max_retries - 1:
-                        log_info(f"  ⚠ 服务器错误 ({status_code})，{wait_time}秒后重试... ({attempt + 1}/{self.max_retries})")
-                        time.sleep(wait_time)
-                    else:
-                        log_info(f"  ❌ 服务器错误 ({status_code})，已重试 {self.max_retries} 次，放弃")
-                        return None
-                else:
-                    log_info(f"  ❌ DeepSeek API 调用失败 (HTTP {status_code}): {e}")
-                    return None
+                status_code = e.response.status_code if e.response is not None else None
+                log_info(f"  ❌ DeepSeek API 调用失败 (HTTP {status_code}): {e}")
+                return None
 
-            except requests.exceptions.ConnectionError as e:
-                wait_time = 2 ** attempt
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                stage = '已停顿' if parts else '无响应'
                 if attempt < self.max_retries - 1:
-                    log_info(f"  ⚠ 网络连接错误，{wait_time}秒后重试... ({attempt + 1}/{self.max_retries})")
+                    wait_time = 2 ** attempt
+                    log_info(f"  ⚠ DeepSeek 流式输出{stage}超过 {self.idle_timeout} 秒，{wait_time}秒后重试... ({attempt + 1}/{self.max_retries})")
                     time.sleep(wait_time)
                 else:
-                    log_info(f"  ❌ 网络连接错误，已重试 {self.max_retries} 次，放弃: {e}")
-                    return None
+                    log_info(f"  ❌ DeepSeek 流式输出{stage}，已重试 {self.max_retries} 次，放弃: {e}")
 
             except Exception as e:
                 log_info(f"  ❌ DeepSeek API 调用失败（未知错误）: {e}")
@@ -308,49 +1302,325 @@ class AISolutionGenerator:
 
         return None
 
+class CatalogEntry:
+    """题目列表条目
+
+    使用 __slots__ 紧凑存储，数千道题目不再各占一个 dict；
+    同时支持 entry['titleSlug'] / entry.get(...) 形式的访问，与原有代码兼容。
+    """
+    __slots__ = ('questionId', 'questionFrontendId', 'titleSlug', 'difficulty')
+
+    DIFFICULTIES = {1: 'Easy', 2: 'Medium', 3: 'Hard'}
+    LEVELS = {'Easy': 1, 'Medium': 2, 'Hard': 3}
+
+    def __init__(self, question_id: str, frontend_id: str, title_slug: str, difficulty: str):
+        self.questionId = question_id
+        self.questionFrontendId = frontend_id
+        self.titleSlug = title_slug
+        self.difficulty = difficulty
+
+    @property
+    def title(self) -> str:
+        return self.titleSlug.replace('-', ' ').title()
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def to_row(self) -> list:
+        """转换为缓存文件中的紧凑行格式"""
+        return [self.questionId, self.questionFrontendId, self.titleSlug,
+                self.LEVELS.get(self.difficulty, 1)]
+
+    @classmethod
+    def from_row(cls, row: list) -> 'CatalogEntry':
+        return cls(row[0], row[1], row[2], cls.DIFFICULTIES.get(row[3], 'Easy'))
+
+class CatalogCache:
+    """题目列表本地缓存（TTL + 条件请求）
+
+    缓存文件保存最近一次的题目列表快照以及服务端返回的 ETag / Last-Modified，
+    TTL 内直接复用；过期后用条件请求刷新，网络失败时回退到旧快照。
+    """
+    def __init__(self, config: Dict):
+        self.cache_file = config.get('cache_file', 'catalog_cache.json')
+        self.ttl_hours = config.get('ttl_hours', 24)
+        self.offline = config.get('offline', False)
+        self._data = None
+        self._entries = None
+
+    def load(self) -> Optional[Dict]:
+        """加载缓存快照"""
+        if self._data is None and os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    self._data = json.load(f)
+            except Exception as e:
+                log_info(f"警告: 加载题目列表缓存失败: {e}")
+        return self._data
+
+    def save(self, questions: List[CatalogEntry], etag: str = '', last_modified: str = ''):
+        """保存缓存快照"""
+        self._entries = list(questions)
+        self._data = {
+            'rows': [q.to_row() for q in questions],
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': time.time()
+        }
+        self._write()
+
+    def touch(self):
+        """服务端返回 304 时只刷新获取时间"""
+        if self._data:
+            self._data['fetched_at'] = time.time()
+            self._write()
+
+    def _write(self):
+        try:
+            tmp_file = f"{self.cache_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            log_info(f"警告: 保存题目列表缓存失败: {e}")
+
+    def is_fresh(self) -> bool:
+        """缓存是否仍在 TTL 内（旧版格式或没有题目的快照视为过期，需要重新获取）"""
+        data = self.load()
+        if not data or not data.get('rows'):
+            return False
+        return time.time() - data.get('fetched_at', 0) < self.ttl_hours * 3600
+
+    def questions(self) -> List[CatalogEntry]:
+        """缓存中的题目列表"""
+        if self._entries is None:
+            data = self.load()
+            self._entries = [CatalogEntry.from_row(row) for row in (data or {}).get('rows') or []]
+        return self._entries
+
+    def conditional_headers(self) -> Dict:
+        """构造条件请求头（快照中没有题目时不发条件请求，否则 304 无法使用）"""
+        data = self.load() or {}
+        headers = {}
+        if not data.get('rows'):
+            return headers
+        if data.get('etag'):
+            headers['If-None-Match'] = data['etag']
+        if data.get('last_modified'):
+            headers['If-Modified-Since'] = data['last_modified']
+        return headers
+
+    def diff_new(self, fresh: List[CatalogEntry]) -> List[str]:
+        """与上一次快照比对，返回新增题目的 ID"""
+        known = {q.questionId for q in self.questions()}
+        return [q.questionId for q in fresh if q.questionId not in known]
+
+class QuestionStore:
+    """题目详情本地存储（SQLite，按内容哈希去重）
+
+    questions 表记录 titleSlug -> 内容哈希和获取时间，blobs 表按哈希保存详情 JSON；
+    重新获取到相同内容时只刷新时间，不重复写入。
+    """
+    def __init__(self, config: Dict):
+        self.enabled = config.get('enabled', True)
+        self.db_file = config.get('db_file', 'question_store.sqlite')
+        self.max_age_days = config.get('max_age_days', 30)
+        self._lock = threading.Lock()
+        self._memo = {}  # titleSlug -> (哈希, 获取时间, 详情 JSON)
+        self._conn = None
+        if self.enabled:
+            try:
+                self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+                self._conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS blobs (
+                        hash TEXT PRIMARY KEY,
+                        data TEXT NOT NULL
+                    );
+                    CREATE TABLE IF NOT EXISTS questions (
+                        slug TEXT PRIMARY KEY,
+                        hash TEXT NOT NULL,
+                        fetched_at REAL NOT NULL
+                    );
+                """)
+            except Exception as e:
+                log_info(f"警告: 打开题目详情存储失败: {e}")
+                self.enabled = False
+
+    def _lookup(self, slug: str) -> Optional[tuple]:
+        if slug in self._memo:
+            return self._memo[slug]
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT q.hash, q.fetched_at, b.data FROM questions q "
+                "JOIN blobs b ON b.hash = q.hash WHERE q.slug = ?",
+                (slug,)
+            ).fetchone()
+        if row:
+            self._memo[slug] = row
+        return row
+
+    def is_stale(self, fetched_at: float) -> bool:
+        """按配置的过期策略判断是否需要重新获取（max_age_days <= 0 表示永不过期）"""
+        if not self.max_age_days or self.max_age_days <= 0:
+            return False
+        return time.time() - fetched_at > self.max_age_days * 86400
+
+    def get(self, slug: str, allow_stale: bool = False) -> Optional[Dict]:
+        """读取题目详情，过期条目默认视为未命中"""
+        if not self.enabled:
+            return None
+        row = self._lookup(slug)
+        if not row:
+            return None
+        if not allow_stale and self.is_stale(row[1]):
+            return None
+        return json.loads(row[2])
+
+    def put(self, slug: str, question: Dict) -> bool:
+        """写入题目详情，返回内容是否发生变化"""
+        if not self.enabled:
+            return False
+        data = json.dumps(question, ensure_ascii=False, sort_keys=True)
+        digest = hashlib.sha256(data.encode('utf-8')).hexdigest()
+        fetched_at = time.time()
+        previous = self._lookup(slug)
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO blobs (hash, data) VALUES (?, ?)", (digest, data))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO questions (slug, hash, fetched_at) VALUES (?, ?, ?)",
+                (slug, digest, fetched_at)
+            )
+            self._conn.commit()
+        self._memo[slug] = (digest, fetched_at, data)
+        return not previous or previous[0] != digest
+
+    def pending_slugs(self, slugs: List[str]) -> List[str]:
+        """筛选出缺失或已过期、需要重新获取的题目"""
+        if not self.enabled:
+            return list(slugs)
+        with self._lock:
+            rows = dict(self._conn.execute("SELECT slug, fetched_at FROM questions").fetchall())
+        return [slug for slug in slugs if slug not in rows or self.is_stale(rows[slug])]
+
+    def get_stats(self) -> Dict:
+        """获取统计信息"""
+        if not self.enabled:
+            return {'questions': 0, 'blobs': 0}
+        with self._lock:
+            questions = self._conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+            blobs = self._conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+        return {'questions': questions, 'blobs': blobs}
+
 class LeetCodeFetcher:
     """LeetCode 题目获取"""
-    def __init__(self):
-        self.base_url = "https://leetcode.cn/graphql"
-        self.api_url = "https://leetcode.cn/api/problems/all/"
+    def __init__(self, catalog_cache: Optional[CatalogCache] = None,
+                 question_store: Optional[QuestionStore] = None,
+                 http_pool: Optional[HTTPSessionPool] = None,
+                 site_url: str = "https://leetcode.cn"):
+        site_url = site_url.rstrip('/')
+        self.base_url = f"{site_url}/graphql"
+        self.api_url = f"{site_url}/api/problems/all/"
         self.headers = {
             "Content-Type": "application/json",
             "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
             "Accept": "application/json",
-            "Referer": "https://leetcode.cn/problemset/all/"
+            "Referer": f"{site_url}/problemset/all/"
         }
+        self.catalog_cache = catalog_cache
+        self.question_store = question_store
+        self.http_pool = http_pool or HTTPSessionPool({})
+        self.new_question_ids = []  # 本次刷新新增的题目
+
+    def get_all_questions(self, offline: bool = False) -> List[CatalogEntry]:
+        """获取所有题目列表（优先使用本地缓存）"""
+        cache = self.catalog_cache
+        if cache:
+            if offline or cache.offline:
+                questions = cache.questions()
+                log_info(f"  离线模式: 使用缓存的题目列表 ({len(questions)} 道)")
+                return questions
+            if cache.is_fresh():
+                questions = cache.questions()
+                log_info(f"  题目列表缓存未过期，跳过网络请求 ({len(questions)} 道)")
+                return questions
 
-    def get_all_questions(self) -> List[Dict]:
-        """获取所有题目列表"""
         try:
-            response = requests.get(
+            headers = dict(self.headers)
+            if cache:
+                headers.update(cache.conditional_headers())
+
+            response = self.http_pool.session(self.api_url).get(
                 self.api_url,
-                headers=self.headers,
+                headers=headers,
                 timeout=10
             )
+
+            if response.status_code == 304 and cache and cache.questions():
+                log_info("  题目列表未变化 (304)，使用缓存")
+                cache.touch()
+                return cache.questions()
+
             response.raise_for_status()
             data = response.json()
 
             questions = []
             for q in (data.get('stat_status_pairs') or []):
                 stat = q.get('stat', {})
-                difficulty_map = {1: 'Easy', 2: 'Medium', 3: 'Hard'}
-                questions.append({
-                    'questionId': str(stat.get('question_id', '')),
-                    'questionFrontendId': str(stat.get('frontend_question_id', '')),
-                    'title': stat.get('question__title_slug', '').replace('-', ' ').title(),
-                    'titleSlug': stat.get('question__title_slug', ''),
-                    'difficulty': difficulty_map.get(q.get('difficulty', {}).get('level', 1), 'Easy'),
-                    'topicTags': []
-                })
+                questions.append(CatalogEntry(
+                    str(stat.get('question_id', '')),
+                    str(stat.get('frontend_question_id', '')),
+                    stat.get('question__title_slug', ''),
+                    CatalogEntry.DIFFICULTIES.get(q.get('difficulty', {}).get('level', 1), 'Easy')
+                ))
+
+            if cache and questions:
+                if cache.questions():
+                    self.new_question_ids = cache.diff_new(questions)
+                    log_info(f"  题目列表已刷新，新增 {len(self.new_question_ids)} 道题目")
+                cache.save(
+                    questions,
+                    etag=response.headers.get('ETag', ''),
+                    last_modified=response.headers.get('Last-Modified', '')
+                )
 
             return questions
         except Exception as e:
             log_info(f"获取题目列表失败: {e}")
+            if cache and cache.questions():
+                log_info(f"  ⚠ 网络不可用，回退到缓存的题目列表 ({len(cache.questions())} 道)")
+                return cache.questions()
             return []
 
-    def get_question_detail(self, title_slug: str) -> Optional[Dict]:
-        """获取题目详情"""
+    def get_question_detail(self, title_slug: str, refresh: bool = False) -> Optional[Dict]:
+        """获取题目详情（优先读取本地存储）"""
+        store = self.question_store
+        if store and not refresh:
+            question = store.get(title_slug)
+            if question:
+                return question
+
+        question = self.fetch_question_detail(title_slug)
+        if question:
+            if store:
+                store.put(title_slug, question)
+            return question
+
+        # 网络失败时退回到已过期的本地副本
+        if store:
+            question = store.get(title_slug, allow_stale=True)
+            if question:
+                log_info(f"  ⚠ 使用本地缓存的题目详情: {title_slug}")
+            return question
+        return None
+
+    def fetch_question_detail(self, title_slug: str) -> Optional[Dict]:
+        """通过 GraphQL 获取题目详情"""
         query = """
         query questionData($titleSlug: String!) {
             question(titleSlug: $titleSlug) {
@@ -380,7 +1650,7 @@ class LeetCodeFetcher:
         variables = {"titleSlug": title_slug}
 
         try:
-            response = requests.post(
+            response = self.http_pool.session(self.base_url).post(
                 self.base_url,
                 json={"query": query, "variables": variables},
                 headers=self.headers,
@@ -410,56 +1680,146 @@ class LeetCodeFetcher:
             log_info(f"  获取详情失败: {e}")
             return None
 
-def filter_by_difficulty(questions: List[Dict], difficulty: str) -> List[Dict]:
+def filter_by_difficulty(questions: List[CatalogEntry], difficulty: str) -> List[CatalogEntry]:
     """按难度筛选题目"""
     return [q for q in questions if q['difficulty'] == difficulty]
 
+class SelectionPool:
+    """按难度划分的待选题目池
+
+    持久化保存每个难度下尚未被选过的题目 ID。选题时随机交换到末尾再弹出，
+    每选一道题只需 O(1)；题目列表新增题目时增量加入，历史记录被外部修改
+    （例如手动重置）时才整体重建一次。
+    """
+    def __init__(self, pool_file: Optional[str] = None):
+        self.pool_file = pool_file
+        self.pools = {}  # 难度 -> [题目 ID]
+        self.history_size = -1
+        self.catalog_size = -1
+        self._entries = {}
+        if pool_file and os.path.exists(pool_file):
+            try:
+                with open(pool_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.pools = data.get('pools') or {}
+                self.history_size = data.get('history_size', -1)
+                self.catalog_size = data.get('catalog_size', -1)
+            except Exception as e:
+                log_info(f"警告: 加载待选题目池失败: {e}")
+
+    def sync(self, catalog: List[CatalogEntry], history: QuestionHistory, new_ids: List[str] = ()):
+        """与题目列表和历史记录对齐"""
+        self._entries = {q.questionId: q for q in catalog}
+
+        new_ids = [qid for qid in new_ids if qid in self._entries]
+        expected_size = self.catalog_size + len(new_ids) if self.catalog_size >= 0 else -1
+        if self.history_size != len(history.history) or expected_size != len(catalog):
+            self.rebuild(catalog, history)
+            return
+
+        for qid in new_ids:
+            if not history.contains(qid):
+                self.pools.setdefault(self._entries[qid].difficulty, []).append(qid)
+        self.catalog_size = len(catalog)
+        if new_ids:
+            self.save(history)
+
+    def rebuild(self, catalog: List[CatalogEntry], history: QuestionHistory):
+        """根据题目列表和历史记录重建待选池"""
+        self.pools = {}
+        for q in catalog:
+            if not history.contains(q.questionId):
+                self.pools.setdefault(q.difficulty, []).append(q.questionId)
+        self.catalog_size = len(catalog)
+        self.save(history)
+
+    def pick(self, difficulty: str, count: int, history: QuestionHistory) -> List[CatalogEntry]:
+        """从指定难度中随机选出 count 道题目并移出待选池"""
+        pool = self.pools.setdefault(difficulty, [])
+        picked = []
+        while pool and len(picked) < count:
+            index = random.randrange(len(pool))
+            pool[index], pool[-1] = pool[-1], pool[index]
+            qid = pool.pop()
+            entry = self._entries.get(qid)
+            if entry is not None and not history.contains(qid):
+                picked.append(entry)
+        return picked
+
+    def available(self, difficulty: str) -> int:
+        return len(self.pools.get(difficulty) or [])
+
+    def release(self, questions: List[CatalogEntry], history: QuestionHistory):
+        """把处理失败、未写入历史记录的题目放回待选池（已在池中的不重复加入）"""
+        for q in questions:
+            pool = self.pools.setdefault(q['difficulty'], [])
+            if not history.contains(q['questionId']) and q['questionId'] not in pool:
+                pool.append(q['questionId'])
+        self.save(history)
+
+    def save(self, history: QuestionHistory):
+        """持久化待选池"""
+        self.history_size = len(history.history)
+        if not self.pool_file:
+            return
+        try:
+            tmp_file = f"{self.pool_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'pools': self.pools,
+                    'history_size': self.history_size,
+                    'catalog_size': self.catalog_size
+                }, f, separators=(',', ':'))
+            os.replace(tmp_file, self.pool_file)
+        except Exception as e:
+            log_info(f"警告: 保存待选题目池失败: {e}")
+
 def select_questions_by_difficulty(
-    all_questions: List[Dict],
+    all_questions: List[CatalogEntry],
     difficulty_config: Dict,
-    history: QuestionHistory
-) -> List[Dict]:
+    history: QuestionHistory,
+    pool: Optional[SelectionPool] = None
+) -> List[CatalogEntry]:
     """按难度选择题目，避免重复"""
-    selected = []
+    if pool is None:
+        pool = SelectionPool()
+        pool.sync(all_questions, history)
 
+    selected = []
     for difficulty, count in difficulty_config.items():
         difficulty_key = difficulty.capitalize()
-        available = filter_by_difficulty(all_questions, difficulty_key)
+        picked = pool.pick(difficulty_key, count, history)
 
-        # 排除历史记录中的题目
-        available = [q for q in available if not history.contains(q['questionId'])]
+        if len(picked) < count:
+            log_info(f"  ⚠ {difficulty_key} 难度可用题目不足 ({len(picked)}/{count})")
 
-        if len(available) < count:
-            log_info(f"  ⚠ {difficulty_key} 难度可用题目不足 ({len(available)}/{count})")
-            count = len(available)
-
-        if count > 0:
-            selected.extend(random.sample(available, count))
+        selected.extend(picked)
 
+    pool.save(history)
     return selected
 
+def markdown_filename(question: Dict, date_str: str) -> str:
+    """生成 Markdown 文件名：题目号_难度_中文题目名_日期.md"""
+    # 清理中文标题，移除不适合文件名的字符
+    chinese_title = re.sub(r'[<>:"/\\|?*]', '', question['title']).strip()
+
+    # 难度映射
+    difficulty_map = {'Easy': '简单', 'Medium': '中等', 'Hard': '困难'}
+    difficulty_cn = difficulty_map.get(question['difficulty'], question['difficulty'])
+
+    return f"{question['questionFrontendId']}_{difficulty_cn}_{chinese_title}_{date_str}.md"
+
 def save_as_markdown(
     question: Dict,
     ai_solution: Optional[str],
-    output_dir: str
+    output_dir: str,
+    date_str: Optional[str] = None
 ) -> bool:
-    """保存题目和解答为 Markdown 文件"""
+    """保存题目和解答为 Markdown 文件（date_str 默认为当天，续跑时沿用原运行的日期）"""
     Path(output_dir).mkdir(parents=True, exist_ok=True)
 
-    # 生成文件名：题目号_难度_中文题目名_日期.md
-    date_str = datetime.now().strftime("%Y%m%d")
-
-    # 清理中文标题，移除特殊字符
-    chinese_title = question['title']
-    # 移除不适合文件名的字符
-    chinese_title = re.sub(r'[<>:"/\\|?*]', '', chinese_title)
-    chinese_title = chinese_title.strip()
-
-    # 难度映射
-    difficulty_map = {'Easy': '简单', 'Medium': '中等', 'Hard': '困难'}
-    difficulty_cn = difficulty_map.get(question['difficulty'], question['difficulty'])
-
-    filename = f"{question['questionFrontendId']}_{difficulty_cn}_{chinese_title}_{date_str}.md"
+    date_str = date_str or datetime.now().strftime("%Y%m%d")
+    filename = markdown_filename(question, date_str)
     filepath = os.path.join(output_dir, filename)
 
     if os.path.exists(filepath):
@@ -515,31 +1875,382 @@ def save_as_markdown(
     log_info(f"  ✓ 已保存: {filename}")
     return True
 
-class HTMLGenerator:
-    """HTML 页面生成器（三层架构）"""
-    def __init__(self, docs_dir: str = "docs"):
-        self.docs_dir = Path(docs_dir)
-        self.docs_dir.mkdir(parents=True, exist_ok=True)
+class CorpusIndex:
+    """本地题库索引（SQLite）
 
-    def parse_markdown_file(self, md_file_path: str) -> Optional[Dict]:
-        """解析单个 markdown 文件，提取题目信息"""
+    为 output_dir 下已生成的 Markdown 文件维护 题号、slug、难度、标签、日期、是否有 AI 解答 等字段，
+    查询直接走索引，不需要遍历目录和解析文件。每个文件按 (mtime, size) 增量更新；
+    目录本身的 mtime 记录在 meta 表中，目录未变化（没有新增、删除或替换文件）时查询前无需扫描。
+    """
+    SCHEMA_VERSION = 1
+    DIFFICULTY_NAMES = {'简单': 'Easy', '中等': 'Medium', '困难': 'Hard'}
+
+    def __init__(self, config: Dict):
+        self.enabled = config.get('enabled', True)
+        self.db_file = config.get('db_file', 'corpus_index.sqlite')
+        self._conn = None
+        if self.enabled:
+            try:
+                self._conn = sqlite3.connect(self.db_file)
+                if self._conn.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA_VERSION:
+                    self._conn.executescript("""
+                        DROP TABLE IF EXISTS questions;
+                        DROP TABLE IF EXISTS tags;
+                        DROP TABLE IF EXISTS meta;
+                    """)
+                self._conn.executescript(f"""
+                    CREATE TABLE IF NOT EXISTS questions (
+                        path TEXT PRIMARY KEY,
+                        number TEXT NOT NULL,
+                        slug TEXT NOT NULL,
+                        title TEXT NOT NULL,
+                        difficulty TEXT NOT NULL,
+                        date TEXT NOT NULL,
+                        tags TEXT NOT NULL,
+                        has_ai INTEGER NOT NULL,
+                        mtime REAL NOT NULL,
+                        size INTEGER NOT NULL
+                    );
+                    CREATE TABLE IF NOT EXISTS tags (
+                        tag TEXT NOT NULL,
+                        path TEXT NOT NULL,
+                        PRIMARY KEY (tag, path)
+                    ) WITHOUT ROWID;
+                    CREATE TABLE IF NOT EXISTS meta (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL
+                    );
+                    CREATE INDEX IF NOT EXISTS questions_number ON questions (number);
+                    CREATE INDEX IF NOT EXISTS questions_slug ON questions (slug);
+                    CREATE INDEX IF NOT EXISTS questions_date ON questions (date);
+                    CREATE INDEX IF NOT EXISTS questions_difficulty ON questions (difficulty, date);
+                    CREATE INDEX IF NOT EXISTS tags_path ON tags (path);
+                    PRAGMA user_version = {self.SCHEMA_VERSION};
+                """)
+            except Exception as e:
+                log_info(f"警告: 打开题库索引失败: {e}")
+                self.enabled = False
+
+    @classmethod
+    def parse_file(cls, path: str) -> Optional[Dict]:
+        """解析 save_as_markdown 生成的文件，文件名不符合 题号_难度_标题_日期.md 时返回 None"""
+        parts = Path(path).stem.split('_')
+        if len(parts) < 4 or not re.fullmatch(r'\d{8}', parts[-1]):
+            return None
         try:
-            with open(md_file_path, 'r', encoding='utf-8') as f:
+            with open(path, 'r', encoding='utf-8') as f:
                 content = f.read()
+        except OSError:
+            return None
 
-            # 从文件名提取难度：题号_难度_标题_日期.md
-            filename = Path(md_file_path).stem
-            parts = filename.split('_')
+        title_match = re.search(r'^#\s+([\w\s]+)\.\s+(.+)$', content, re.MULTILINE)
+        difficulty_match = re.search(r'^\*\*难度\*\*:\s*(\w+)', content, re.MULTILINE)
+        tags_match = re.search(r'^\*\*标签\*\*:\s*(.*)$', content, re.MULTILINE)
+        slug_match = re.search(r'https://leetcode\.cn/problems/([^/\s\)]+)', content)
+        return {
+            'number': title_match.group(1).strip() if title_match else parts[0],
+            'title': title_match.group(2).strip() if title_match else '_'.join(parts[2:-1]),
+            'slug': slug_match.group(1) if slug_match else '',
+            'difficulty': difficulty_match.group(1) if difficulty_match
+                          else cls.DIFFICULTY_NAMES.get(parts[1], parts[1]),
+            'tags': [tag.strip() for tag in tags_match.group(1).split(',') if tag.strip()] if tags_match else [],
+            'date': parts[-1],
+            'has_ai': bool(re.search(r'^## AI 解答 \(', content, re.MULTILINE)),
+        }
 
-            difficulty = "medium"  # 默认
-            if len(parts) >= 4:
-                difficulty_str = parts[1]  # 第二部分是难度
-                if difficulty_str in ['简单', 'Easy']:
-                    difficulty = 'easy'
-                elif difficulty_str in ['困难', 'Hard']:
-                    difficulty = 'hard'
-                elif difficulty_str in ['中等', 'Medium']:
-                    difficulty = 'medium'
+    def _upsert(self, path: str, stat: os.stat_result) -> bool:
+        info = self.parse_file(path)
+        self._conn.execute("DELETE FROM tags WHERE path = ?", (path,))
+        if not info:
+            self._conn.execute("DELETE FROM questions WHERE path = ?", (path,))
+            return False
+        self._conn.execute(
+            "INSERT OR REPLACE INTO questions (path, number, slug, title, difficulty, date, tags, has_ai, mtime, size) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, info['number'], info['slug'], info['title'], info['difficulty'], info['date'],
+             json.dumps(info['tags'], ensure_ascii=False), int(info['has_ai']), stat.st_mtime, stat.st_size)
+        )
+        self._conn.executemany("INSERT OR IGNORE INTO tags (tag, path) VALUES (?, ?)",
+                               [(tag, path) for tag in info['tags']])
+        return True
+
+    def add_files(self, paths: List[str]) -> int:
+        """把刚保存的文件写入索引，返回写入的文件数"""
+        if not self.enabled:
+            return 0
+        count = 0
+        with self._conn:
+            for path in paths:
+                try:
+                    count += self._upsert(path, os.stat(path))
+                except OSError:
+                    continue
+        return count
+
+    def is_current(self, source_dir: str) -> bool:
+        """目录 mtime 与上次刷新时一致时，索引中的文件列表仍然有效"""
+        if not self.enabled:
+            return False
+        try:
+            mtime = str(os.stat(source_dir).st_mtime_ns)
+        except OSError:
+            return False
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (f'dir_mtime:{source_dir}',)).fetchone()
+        return bool(row) and row[0] == mtime
+
+    def refresh(self, source_dir: str) -> Dict:
+        """增量刷新：只重新解析 mtime 或大小变化的文件，删除已不存在的文件"""
+        summary = {'indexed': 0, 'unchanged': 0, 'removed': 0}
+        if not self.enabled:
+            return summary
+        try:
+            dir_mtime = str(os.stat(source_dir).st_mtime_ns)
+            entries = [entry for entry in os.scandir(source_dir)
+                       if entry.name.endswith('.md') and entry.is_file()]
+        except OSError:
+            entries, dir_mtime = [], None
+
+        prefix = os.path.join(source_dir, '')
+        known = {path: (mtime, size) for path, mtime, size in self._conn.execute(
+            "SELECT path, mtime, size FROM questions WHERE path LIKE ? ESCAPE '\\'",
+            (prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%',)
+        )}
+        with self._conn:
+            for entry in entries:
+                path = os.path.join(source_dir, entry.name)
+                stat = entry.stat()
+                if known.pop(path, None) == (stat.st_mtime, stat.st_size):
+                    summary['unchanged'] += 1
+                elif self._upsert(path, stat):
+                    summary['indexed'] += 1
+            for path in known:
+                self._conn.execute("DELETE FROM questions WHERE path = ?", (path,))
+                self._conn.execute("DELETE FROM tags WHERE path = ?", (path,))
+                summary['removed'] += 1
+            if dir_mtime:
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                   (f'dir_mtime:{source_dir}', dir_mtime))
+        return summary
+
+    def query(self, numbers: List[str] = (), slug: Optional[str] = None, difficulty: Optional[str] = None,
+              tags: List[str] = (), since: Optional[str] = None, until: Optional[str] = None,
+              has_ai: Optional[bool] = None, limit: int = 0) -> List[Dict]:
+        """按条件查询，多个标签需全部匹配；日期为 YYYYMMDD，since/until 均包含边界。结果按日期倒序"""
+        if not self.enabled:
+            return []
+        clauses, params = [], []
+        if numbers:
+            clauses.append(f"q.number IN ({','.join('?' * len(numbers))})")
+            params.extend(numbers)
+        if slug:
+            clauses.append("q.slug = ?")
+            params.append(slug)
+        if difficulty:
+            clauses.append("q.difficulty = ?")
+            params.append(difficulty.capitalize())
+        for tag in tags:
+            clauses.append("q.path IN (SELECT path FROM tags WHERE tag = ?)")
+            params.append(tag)
+        if since:
+            clauses.append("q.date >= ?")
+            params.append(since)
+        if until:
+            clauses.append("q.date <= ?")
+            params.append(until)
+        if has_ai is not None:
+            clauses.append("q.has_ai = ?")
+            params.append(int(has_ai))
+
+        sql = "SELECT q.path, q.number, q.slug, q.title, q.difficulty, q.date, q.has_ai, q.tags FROM questions q"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY q.date DESC, q.number"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [
+            {'number': number, 'slug': slug, 'title': title, 'difficulty': difficulty, 'date': date,
+             'has_ai': bool(ai), 'tags': json.loads(tag_list), 'path': path}
+            for path, number, slug, title, difficulty, date, ai, tag_list in self._conn.execute(sql, params)
+        ]
+
+    def get_stats(self) -> Dict:
+        """获取统计信息"""
+        if not self.enabled:
+            return {'questions': 0, 'with_ai': 0}
+        total, with_ai = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(has_ai), 0) FROM questions").fetchone()
+        return {'questions': total, 'with_ai': with_ai}
+
+class MarkdownRenderer:
+    """Markdown 渲染层
+
+    通过 render.backend 选择渲染引擎，渲染结果按 (引擎, 内容哈希) 缓存为 HTML 片段文件，
+    重新生成整站时未变化的内容直接读取缓存。配置的引擎未安装时回退到 markdown2。
+    """
+    BACKENDS = ('markdown2', 'cmarkgfm', 'markdown-it', 'mistune')
+    # 修改引擎参数（扩展、选项）时递增，使旧的片段缓存失效
+    CACHE_VERSION = 1
+
+    def __init__(self, config: Dict):
+        self.cache_enabled = config.get('cache', True)
+        self.cache_dir = Path(config.get('cache_dir', '.render_cache'))
+        self.hits = 0
+        self.misses = 0
+        self.backend = config.get('backend', 'markdown2')
+        if self.backend not in self.BACKENDS:
+            log_info(f"  ⚠ 未知的 Markdown 渲染引擎 {self.backend}（可选: {', '.join(self.BACKENDS)}），改用 markdown2")
+            self.backend = 'markdown2'
+        self._render = self.load_backend(self.backend)
+        if self._render is None and self.backend != 'markdown2':
+            log_info(f"  ⚠ Markdown 渲染引擎 {self.backend} 未安装，改用 markdown2")
+            self.backend = 'markdown2'
+            self._render = self.load_backend(self.backend)
+
+    @staticmethod
+    def load_backend(name: str) -> Optional[Callable[[str], str]]:
+        """加载渲染引擎，返回 render(text) -> html；未安装时返回 None"""
+        if name not in MarkdownRenderer.BACKENDS:
+            raise ValueError(f"未知的 Markdown 渲染引擎: {name}（可选: {', '.join(MarkdownRenderer.BACKENDS)}）")
+        try:
+            if name == 'markdown2':
+                markdown2 = load_markdown2()
+                if markdown2 is None:
+                    return None
+                return lambda text: markdown2.markdown(
+                    text,
+                    extras=['fenced-code-blocks', 'tables', 'header-ids']
+                )
+            if name == 'cmarkgfm':
+                import cmarkgfm
+                from cmarkgfm.cmark import Options
+                # 保留题目描述中的原始 HTML，与 markdown2 行为一致
+                return lambda text: cmarkgfm.github_flavored_markdown_to_html(
+                    text, options=Options.CMARK_OPT_UNSAFE
+                )
+            if name == 'markdown-it':
+                from markdown_it import MarkdownIt
+                return MarkdownIt('commonmark').enable('table').render
+            import mistune
+            return mistune.create_markdown(escape=False, plugins=['table'])
+        except ImportError:
+            return None
+
+    def available(self) -> bool:
+        return self._render is not None
+
+    def cache_path(self, text: str) -> Path:
+        key = hashlib.sha256(f"{self.backend}\0{self.CACHE_VERSION}\0{text}".encode('utf-8')).hexdigest()
+        return self.cache_dir / key[:2] / f"{key}.html"
+
+    def render(self, text: str) -> Optional[str]:
+        """渲染 Markdown，优先读取片段缓存"""
+        if self._render is None:
+            return None
+        path = self.cache_path(text) if self.cache_enabled else None
+        if path is not None and path.exists():
+            try:
+                html = path.read_text(encoding='utf-8')
+                self.hits += 1
+                return html
+            except OSError:
+                pass
+
+        self.misses += 1
+        html = self._render(text)
+        if path is not None:
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_file = path.with_suffix('.tmp')
+                tmp_file.write_text(html, encoding='utf-8')
+                os.replace(tmp_file, path)
+            except OSError as e:
+                log_info(f"  ⚠ 写入渲染缓存失败: {e}")
+        return html
+
+    def log_summary(self):
+        """输出片段缓存命中统计"""
+        total = self.hits + self.misses
+        if total:
+            log_info(f"Markdown 渲染 ({self.backend}): 缓存命中 {self.hits}/{total} 次")
+
+class HTMLGenerator:
+    """HTML 页面生成器（三层架构）
+
+    page_mode 为 full 时每道题生成一个完整的 HTML 页面；为 shell 时所有题目共用
+    docs/question.html 外壳页，每道题只生成 docs/q/<页面名>.html 正文片段，
+    原来的 *_qN.html 地址保留为跳转到外壳页的小页面。
+    """
+    # 修改页面模板、样式引用等影响输出的内容时递增，build 会据此重新生成所有页面
+    TEMPLATE_VERSION = 1
+    PAGE_MODES = ('full', 'shell')
+    SHELL_PAGE = "question.html"
+
+    def __init__(self, docs_dir: str = "docs", history_latest: int = 20,
+                 renderer: Optional[MarkdownRenderer] = None, page_mode: str = 'full',
+                 assets: Optional['AssetPipeline'] = None):
+        if page_mode not in self.PAGE_MODES:
+            log_info(f"  ⚠ 未知的页面模式 {page_mode}（可选: {', '.join(self.PAGE_MODES)}），改用 full")
+            page_mode = 'full'
+        self.docs_dir = Path(docs_dir)
+        self.docs_dir.mkdir(parents=True, exist_ok=True)
+        self.history_latest = history_latest
+        self.renderer = renderer or MarkdownRenderer({})
+        self.page_mode = page_mode
+        self.assets = assets
+        self.fragment_dir = self.docs_dir / "q"
+        self._shell_written = False
+        # 本次生成和删除的文件，发布时只暂存这些路径
+        self.written = set()
+        self.removed = set()
+        self.manifest_file = self.docs_dir / "build_manifest.json"
+        self.manifest = self.load_manifest()
+
+    def load_manifest(self) -> Dict:
+        """加载构建清单：每个题目页面对应的源文件、内容哈希和模板版本"""
+        if self.manifest_file.exists():
+            try:
+                with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                    return json.load(f).get('pages') or {}
+            except Exception as e:
+                log_info(f"  ⚠ 加载构建清单失败: {e}")
+        return {}
+
+    def save_manifest(self):
+        """保存构建清单"""
+        try:
+            with open(self.manifest_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'template_version': self.TEMPLATE_VERSION,
+                    'pages': dict(sorted(self.manifest.items()))
+                }, f, ensure_ascii=False, indent=2)
+            self.written.add(self.manifest_file)
+        except Exception as e:
+            log_info(f"  ✗ 保存构建清单失败: {e}")
+
+    @staticmethod
+    def file_hash(path: str) -> str:
+        """计算源文件内容哈希"""
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def parse_markdown_file(self, md_file_path: str) -> Optional[Dict]:
+        """解析单个 markdown 文件，提取题目信息"""
+        try:
+            with open(md_file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+
+            # 从文件名提取难度：题号_难度_标题_日期.md
+            filename = Path(md_file_path).stem
+            parts = filename.split('_')
+
+            difficulty = "medium"  # 默认
+            if len(parts) >= 4:
+                difficulty_str = parts[1]  # 第二部分是难度
+                if difficulty_str in ['简单', 'Easy']:
+                    difficulty = 'easy'
+                elif difficulty_str in ['困难', 'Hard']:
+                    difficulty = 'hard'
+                elif difficulty_str in ['中等', 'Medium']:
+                    difficulty = 'medium'
 
             # 提取题号和标题（支持 "1. 两数之和" 和 "LCR 031. LRU 缓存" 格式）
             title_match = re.search(r'^#\s+([\w\s]+)\.\s+(.+)$', content, re.MULTILINE)
@@ -552,55 +2263,38 @@ class HTMLGenerator:
             if url_match:
                 leetcode_url = url_match.group(0)
 
+            # 提取标签
+            tags = []
+            tags_match = re.search(r'^\*\*标签\*\*:\s*(.*)$', content, re.MULTILINE)
+            if tags_match:
+                tags = [tag.strip() for tag in tags_match.group(1).split(',') if tag.strip()]
+
             return {
                 'number': question_number,
                 'title': question_title,
                 'difficulty': difficulty,
                 'content': content,
-                'url': leetcode_url
+                'url': leetcode_url,
+                'tags': tags
             }
 
         except Exception as e:
             log_info(f"  ⚠️ 解析失败 {md_file_path}: {e}")
             return None
 
-    def generate_question_html(self, question_info: Dict, record_id: str, question_index: int, date_str: str, time_str: str) -> Optional[str]:
-        """生成单个题目的 HTML 文件"""
-        if not MARKDOWN2_AVAILABLE:
-            return None
-
-        # 转换 Markdown 为 HTML
-        html_body = markdown2.markdown(
-            question_info['content'],
-            extras=['fenced-code-blocks', 'tables', 'header-ids']
-        )
-
-        # 格式化日期时间
-        formatted_date = f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:]}"
-        formatted_time = f"{time_str[:2]}:{time_str[2:4]}:{time_str[4:]}"
-
-        # 生成文件名
-        html_filename = f"{record_id}_q{question_index}.html"
-        html_file = self.docs_dir / html_filename
-
-        # 难度中文映射
-        difficulty_map = {
-            'easy': '简单',
-            'medium': '中等',
-            'hard': '困难'
-        }
-        difficulty_cn = difficulty_map.get(question_info['difficulty'], '未知')
-
-        # 生成完整 HTML
-        full_html = f"""<!DOCTYPE html>
+    @staticmethod
+    def page_html(title: str, update_time: str, heading: str, difficulty_html: str,
+                  link_html: str, body_html: str, body_attrs: str = '', scripts: str = '') -> str:
+        """题目页面的公共外框（完整页面和外壳页共用）"""
+        return f"""<!DOCTYPE html>
 <html lang="zh-CN">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{question_info['number']}. {question_info['title']} - LeetCode</title>
+    <title>{title}</title>
     <link rel="stylesheet" href="css/style.css">
 </head>
-<body>
+<body{body_attrs}>
     <!-- 顶部导航栏 -->
     <div class="top-bar">
         <button class="menu-button" onclick="history.back()" aria-label="返回">
@@ -613,7 +2307,7 @@ class HTMLGenerator:
             <span class="logo-emoji">📚</span>
             LeetCode 每日题目
         </div>
-        <div class="update-time">{formatted_date} {formatted_time}</div>
+        <div class="update-time" id="pageTime">{update_time}</div>
     </div>
 
     <!-- 主内容区 -->
@@ -625,14 +2319,12 @@ class HTMLGenerator:
 
             <div class="question-card">
                 <div class="question-header">
-                    <span class="question-number">{question_info['number']}. {question_info['title']}</span>
-                    <span class="difficulty-badge difficulty-{question_info['difficulty']}">
-                        {difficulty_cn}
-                    </span>
-                    {f'<a href="{question_info["url"]}" target="_blank" class="question-link">在 LeetCode 打开</a>' if question_info['url'] else ''}
+                    <span class="question-number" id="questionTitle">{heading}</span>
+                    {difficulty_html}
+                    {link_html}
                 </div>
-                <div class="markdown-content">
-                    {html_body}
+                <div class="markdown-content" id="questionContent">
+                    {body_html}
                 </div>
             </div>
 
@@ -646,21 +2338,132 @@ class HTMLGenerator:
     <!-- 浮动返回按钮 -->
     <button class="fab-back" onclick="history.back()" aria-label="返回题目列表">
         ↑
-    </button>
+    </button>{scripts}
 </body>
 </html>"""
 
+    def write_shell_page(self):
+        """生成共享外壳页（内容不变时不改写，保持浏览器和 git 中的缓存有效）"""
+        if self._shell_written:
+            return
+        shell_html = self.page_html(
+            title="LeetCode 每日题目",
+            update_time="",
+            heading="加载中...",
+            difficulty_html='<span class="difficulty-badge" id="questionDifficulty" style="display: none;"></span>',
+            link_html='<a id="questionLink" target="_blank" class="question-link" style="display: none;">在 LeetCode 打开</a>',
+            body_html="",
+            body_attrs=' data-page="question"',
+            scripts='\n    <script src="js/app.js"></script>'
+        )
+        if self.assets is not None:
+            # 直接写入带指纹的资源引用，内容不变时不会被资源处理再改写一次
+            shell_html = self.assets.published_page(shell_html)
+        shell_file = self.docs_dir / self.SHELL_PAGE
+        if not shell_file.exists() or shell_file.read_text(encoding='utf-8') != shell_html:
+            shell_file.write_text(shell_html, encoding='utf-8')
+            self.written.add(shell_file)
+        self._shell_written = True
+
+    def redirect_stub_html(self, page_id: str, title: str) -> str:
+        """旧版 *_qN.html 地址的跳转页"""
+        target = f"{self.SHELL_PAGE}#{page_id}"
+        return f"""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <title>{escape(title)}</title>
+    <meta http-equiv="refresh" content="0; url={target}">
+    <link rel="canonical" href="{target}">
+</head>
+<body>
+    <a href="{target}">{escape(title)}</a>
+</body>
+</html>
+"""
+
+    def fragment_path(self, html_filename: str) -> Path:
+        return self.fragment_dir / html_filename
+
+    @staticmethod
+    def fragment_html(question_info: Dict, update_time: str, body_html: str) -> str:
+        """shell 模式下的题目片段：元数据放在 data 属性里，正文保持原样，避免 JSON 转义膨胀"""
+        attrs = {
+            'number': question_info['number'],
+            'title': question_info['title'],
+            'difficulty': question_info['difficulty'],
+            'url': question_info['url'] or '',
+            'date': update_time
+        }
+        attr_html = ' '.join(f'data-{key}="{escape(str(value))}"' for key, value in attrs.items())
+        return f"<article {attr_html}>\n{body_html}\n</article>\n"
+
+    def generate_question_html(self, question_info: Dict, record_id: str, question_index: int, date_str: str, time_str: str, source_file: Optional[str] = None) -> Optional[str]:
+        """生成单个题目的 HTML 文件（shell 模式下生成 q/ 下的 HTML 片段和跳转页）"""
+        # 转换 Markdown 为 HTML（内容未变化时直接读取片段缓存）
+        html_body = self.renderer.render(question_info['content'])
+        if html_body is None:
+            return None
+
+        # 格式化日期时间
+        formatted_date = f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:]}"
+        formatted_time = f"{time_str[:2]}:{time_str[2:4]}:{time_str[4:]}"
+
+        # 生成文件名
+        html_filename = f"{record_id}_q{question_index}.html"
+        html_file = self.docs_dir / html_filename
+        page_title = f"{question_info['number']}. {question_info['title']} - LeetCode"
+
         try:
+            if self.page_mode == 'shell':
+                self.write_shell_page()
+                self.fragment_dir.mkdir(parents=True, exist_ok=True)
+                self.fragment_path(html_filename).write_text(
+                    self.fragment_html(question_info, f"{formatted_date} {formatted_time}", html_body),
+                    encoding='utf-8'
+                )
+                self.written.add(self.fragment_path(html_filename))
+                full_html = self.redirect_stub_html(Path(html_filename).stem, page_title)
+            else:
+                # 难度中文映射
+                difficulty_map = {
+                    'easy': '简单',
+                    'medium': '中等',
+                    'hard': '困难'
+                }
+                difficulty_cn = difficulty_map.get(question_info['difficulty'], '未知')
+                full_html = self.page_html(
+                    title=page_title,
+                    update_time=f"{formatted_date} {formatted_time}",
+                    heading=f"{question_info['number']}. {question_info['title']}",
+                    difficulty_html=f"""<span class="difficulty-badge difficulty-{question_info['difficulty']}">
+                        {difficulty_cn}
+                    </span>""",
+                    link_html=f'<a href="{question_info["url"]}" target="_blank" class="question-link">在 LeetCode 打开</a>' if question_info['url'] else '',
+                    body_html=html_body
+                )
+
             with open(html_file, 'w', encoding='utf-8') as f:
                 f.write(full_html)
-            return html_filename
+            self.written.add(html_file)
         except Exception as e:
             log_info(f"  ✗ 生成 HTML 失败: {e}")
             return None
 
+        if source_file:
+            self.manifest[html_filename] = {
+                'source': Path(source_file).as_posix(),
+                'source_hash': self.file_hash(source_file),
+                'template_version': self.TEMPLATE_VERSION,
+                'renderer': self.renderer.backend,
+                'page_mode': self.page_mode,
+                'tags': question_info.get('tags') or []
+            }
+        return html_filename
+
     def convert_markdown_to_html(self, md_files: List[str], date_str: str, time_str: str) -> Optional[List[Dict]]:
         """将当天的 markdown 文件转换为独立的题目 HTML 文件（三层架构）"""
-        if not MARKDOWN2_AVAILABLE:
+        if not self.renderer.available():
             log_info("  ⚠ markdown2 未安装，跳过 HTML 生成")
             return None
 
@@ -680,7 +2483,8 @@ class HTMLGenerator:
                     record_id,
                     q_idx,
                     date_str,
-                    time_str
+                    time_str,
+                    source_file=md_file
                 )
 
                 if html_filename:
@@ -692,13 +2496,340 @@ class HTMLGenerator:
                     })
                     log_info(f"  ✓ 已生成题目 {q_idx}: {html_filename}")
 
+        self.save_manifest()
+
         if questions:
             return questions
         else:
             return None
 
+    def build_site(self, source_dir: str, force: bool = False, dry_run: bool = False) -> Dict:
+        """增量构建：只重新生成源文件、模板或渲染引擎已变化的页面，并清理孤立页面"""
+        summary = {'rebuilt': 0, 'fresh': 0, 'missing_source': 0, 'removed': 0}
+
+        # 题号 + 日期 -> 源文件（文件名格式：题号_难度_标题_日期.md）
+        sources = {}
+        for md_file in Path(source_dir).glob('*.md'):
+            parts = md_file.stem.split('_')
+            if len(parts) >= 4:
+                sources[(parts[0], parts[-1])] = md_file.as_posix()
+
+        referenced = set()
+        records, history_complete = self.load_history_records()
+        for record in records:
+            record_id = record.get('record_id', '')
+            if len(record_id) != 15:
+                continue
+            date_str, time_str = record_id.split('_')
+            for question in (record.get('questions') or []):
+                html_filename = question.get('file', '')
+                match = re.fullmatch(r'\d{8}_\d{6}_q(\d+)\.html', html_filename)
+                if not match:
+                    continue
+                referenced.add(html_filename)
+
+                entry = self.manifest.get(html_filename)
+                source = entry['source'] if entry else sources.get((question.get('number'), date_str))
+                if not source or not os.path.exists(source):
+                    summary['missing_source'] += 1
+                    continue
+
+                source_hash = self.file_hash(source)
+                if (not force and entry and (self.docs_dir / html_filename).exists()
+                        and entry.get('source_hash') == source_hash
+                        and entry.get('template_version') == self.TEMPLATE_VERSION
+                        and entry.get('renderer', 'markdown2') == self.renderer.backend
+                        and entry.get('page_mode', 'full') == self.page_mode
+                        and (self.page_mode == 'full' or self.fragment_path(html_filename).exists())):
+                    summary['fresh'] += 1
+                    continue
+
+                if (not entry and not force and self.page_mode == 'full'
+                        and (self.docs_dir / html_filename).exists()):
+                    # 旧页面首次纳入清单：只记录哈希，不重复生成
+                    self.manifest[html_filename] = {
+                        'source': source,
+                        'source_hash': source_hash,
+                        'template_version': self.TEMPLATE_VERSION
+                    }
+                    summary['fresh'] += 1
+                    continue
+
+                summary['rebuilt'] += 1
+                if dry_run:
+                    log_info(f"  [dry-run] 需要重新生成: {html_filename}")
+                    continue
+                question_info = self.parse_markdown_file(source)
+                if question_info and self.generate_question_html(
+                        question_info, record_id, int(match.group(1)),
+                        date_str, time_str, source_file=source):
+                    log_info(f"  ✓ 已重新生成: {html_filename}")
+
+        summary['history_complete'] = history_complete
+        if not history_complete:
+            # 历史记录不完整时无法判断哪些页面已不再被引用，不做清理
+            log_info("  ⚠ 历史记录不完整，跳过孤立页面清理")
+            if not dry_run:
+                self.save_manifest()
+            return summary
+
+        # 清理孤立页面：不再被任何历史记录引用的题目页面
+        for html_file in self.docs_dir.glob('*_q*.html'):
+            if re.fullmatch(r'\d{8}_\d{6}_q\d+\.html', html_file.name) and html_file.name not in referenced:
+                summary['removed'] += 1
+                if dry_run:
+                    log_info(f"  [dry-run] 需要删除孤立页面: {html_file.name}")
+                    continue
+                html_file.unlink()
+                self.removed.add(html_file)
+                log_info(f"  ✓ 已删除孤立页面: {html_file.name}")
+        for fragment in self.fragment_dir.glob('*.html'):
+            if fragment.name not in referenced or self.page_mode == 'full':
+                summary['removed'] += 1
+                if dry_run:
+                    log_info(f"  [dry-run] 需要删除片段: q/{fragment.name}")
+                    continue
+                fragment.unlink()
+                self.removed.add(fragment)
+        for html_filename in list(self.manifest):
+            if html_filename not in referenced and not dry_run:
+                del self.manifest[html_filename]
+
+        if not dry_run:
+            self.save_manifest()
+            self.sync_page_mode()
+        return summary
+
+    def sync_page_mode(self):
+        """在 history.json 中记录页面模式，首页据此直接链接到外壳页"""
+        if not (self.docs_dir / "history.json").exists():
+            return
+        manifest = self.load_history_manifest()
+        if manifest.get('page_mode', 'full') != self.page_mode:
+            manifest['page_mode'] = self.page_mode
+            self.write_json(self.docs_dir / "history.json", manifest)
+        if self.page_mode == 'full':
+            shell_file = self.docs_dir / self.SHELL_PAGE
+            if shell_file.exists():
+                shell_file.unlink()
+                self.removed.add(shell_file)
+
+    def write_json(self, path: Path, data, indent: Optional[int] = 2):
+        """原子写入 JSON 文件"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = path.with_name(path.name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+        os.replace(tmp_file, path)
+        self.written.add(path)
+
+    def load_history_manifest(self) -> Dict:
+        """读取 history.json 清单；旧版单文件格式会先迁移为按月分片"""
+        history_file = self.docs_dir / "history.json"
+        data = {}
+        if history_file.exists():
+            with open(history_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        if data.get('version') == 2:
+            return data
+        return self.migrate_history(data.get('records') or [])
+
+    def migrate_history(self, records: List[Dict]) -> Dict:
+        """把旧版 history.json（全部记录在一个列表中，最新在前）拆分为按月分片"""
+        shards = {}
+        for record in reversed(records):
+            month = self.record_month(record)
+            shards.setdefault(month, []).append(record)
+
+        for month, month_records in shards.items():
+            self.write_json(self.shard_path(month), {'month': month, 'records': month_records})
+
+        manifest = {
+            'version': 2,
+            'records': records[:self.history_latest],
+            'shards': [
+                {'month': month, 'file': f"history/{month}.json", 'count': len(shards[month])}
+                for month in sorted(shards, reverse=True)
+            ],
+            'total_records': len(records),
+            'total_questions': sum(r.get('count', 0) for r in records),
+            'active_days': len({r.get('date', '').split(' ')[0] for r in records}),
+            'last_date': records[0].get('date', '').split(' ')[0] if records else '',
+            'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        if records:
+            self.write_json(self.docs_dir / "history.json", manifest)
+            log_info(f"  ✓ history.json 已迁移为 {len(shards)} 个月度分片")
+        return manifest
+
+    @staticmethod
+    def record_month(record: Dict) -> str:
+        """记录所属月份（YYYY-MM）"""
+        record_id = record.get('record_id', '')
+        if re.match(r'\d{8}_', record_id):
+            return f"{record_id[:4]}-{record_id[4:6]}"
+        return record.get('date', '')[:7] or 'unknown'
+
+    def shard_path(self, month: str) -> Path:
+        return self.docs_dir / "history" / f"{month}.json"
+
+    def load_history_records(self) -> tuple:
+        """读取所有月度分片中的历史记录，返回 (记录列表, 是否完整)
+
+        history.json 不存在或无法解析、清单中列出的分片缺失或无法解析时视为不完整，
+        此时已读取到的记录仍然返回。
+        """
+        history_file = self.docs_dir / "history.json"
+        try:
+            with open(history_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            log_info(f"  ⚠ 无法读取 history.json: {e}")
+            return [], False
+        if manifest.get('version') != 2:
+            # 尚未迁移的旧版单文件格式
+            return list(manifest.get('records') or []), True
+
+        records, complete = [], True
+        for shard in manifest.get('shards') or []:
+            try:
+                with open(self.docs_dir / shard['file'], 'r', encoding='utf-8') as f:
+                    records.extend(json.load(f).get('records') or [])
+            except (OSError, json.JSONDecodeError) as e:
+                log_info(f"  ⚠ 无法读取历史分片 {shard['file']}: {e}")
+                complete = False
+        return records, complete
+
+    # ---- 搜索索引 ----
+    # 倒排表按词项哈希分片，文档表按固定大小分块；前端只下载查询涉及的分片。
+    # 分词规则需与 docs/js/app.js 中的 SearchIndex 保持一致。
+    SEARCH_SHARDS = 32
+    SEARCH_CHUNK_SIZE = 256
+    SEARCH_PREFIX_MAX = 12
+
+    @classmethod
+    def search_tokens(cls, text: str, for_query: bool = False) -> List[str]:
+        """分词：英文/数字按单词（索引时附带前缀），中文按单字 + 相邻二字"""
+        tokens = []
+        for run in re.findall(r'[a-z0-9]+|[\u3400-\u9fff]+', (text or '').lower()):
+            if run[0] < '\u3400':
+                tokens.append(run)
+                if not for_query:
+                    tokens.extend(run[:n] for n in range(2, min(len(run), cls.SEARCH_PREFIX_MAX)))
+            elif len(run) == 1:
+                tokens.append(run)
+            else:
+                if not for_query:
+                    tokens.extend(run)
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        return list(dict.fromkeys(tokens))
+
+    @classmethod
+    def search_shard(cls, token: str) -> int:
+        """词项所在分片（32 位 FNV-1a，按 Unicode 码点计算）"""
+        h = 0x811c9dc5
+        for ch in token:
+            h ^= ord(ch)
+            h = (h * 0x01000193) & 0xffffffff
+        return h % cls.SEARCH_SHARDS
+
+    def search_doc_tokens(self, doc: Dict) -> List[str]:
+        difficulty_cn = {'easy': '简单', 'medium': '中等', 'hard': '困难'}.get(doc['difficulty'], '')
+        text = ' '.join([doc['number'], doc['title'], doc['difficulty'], difficulty_cn] + doc.get('tags', []))
+        return self.search_tokens(text)
+
+    def search_docs_for_record(self, record: Dict) -> List[Dict]:
+        """把一条历史记录转换为搜索文档"""
+        docs = []
+        for question in (record.get('questions') or []):
+            entry = self.manifest.get(question.get('file', ''), {})
+            tags = entry.get('tags')
+            if tags is None and entry.get('source') and os.path.exists(entry['source']):
+                tags = (self.parse_markdown_file(entry['source']) or {}).get('tags')
+            docs.append({
+                'number': question.get('number', ''),
+                'title': question.get('title', ''),
+                'difficulty': question.get('difficulty', ''),
+                'file': question.get('file', ''),
+                'date': record.get('date', '').split(' ')[0],
+                'tags': tags or []
+            })
+        return docs
+
+    def update_search_index(self, docs: List[Dict]) -> bool:
+        """把新文档追加到搜索索引，只改写涉及的文档块和倒排分片"""
+        search_dir = self.docs_dir / "search"
+        meta_file = search_dir / "meta.json"
+
+        def read(path: Path, default):
+            if path.exists():
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            return default
+
+        try:
+            meta = read(meta_file, {
+                'version': 1,
+                'doc_count': 0,
+                'chunk_size': self.SEARCH_CHUNK_SIZE,
+                'shards': self.SEARCH_SHARDS
+            })
+
+            chunks = {}
+            postings = {}
+            for doc in docs:
+                doc_id = meta['doc_count']
+                meta['doc_count'] += 1
+
+                chunk_id = doc_id // meta['chunk_size']
+                if chunk_id not in chunks:
+                    chunks[chunk_id] = read(search_dir / f"docs-{chunk_id}.json", [])
+                chunks[chunk_id].append([doc['number'], doc['title'], doc['difficulty'],
+                                         doc['file'], doc['date'], doc['tags']])
+
+                for token in self.search_doc_tokens(doc):
+                    postings.setdefault(self.search_shard(token), {}).setdefault(token, []).append(doc_id)
+
+            for chunk_id, chunk in chunks.items():
+                self.write_json(search_dir / f"docs-{chunk_id}.json", chunk, indent=None)
+
+            for shard_id, shard_postings in postings.items():
+                shard_file = search_dir / f"idx-{shard_id:02d}.json"
+                shard = read(shard_file, {})
+                for token, doc_ids in shard_postings.items():
+                    shard.setdefault(token, []).extend(doc_ids)
+                self.write_json(shard_file, shard, indent=None)
+
+            meta['updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            self.write_json(meta_file, meta)
+            return True
+
+        except Exception as e:
+            log_info(f"  ✗ 更新搜索索引失败: {e}")
+            return False
+
+    def rebuild_search_index(self) -> int:
+        """根据全部历史记录重建搜索索引"""
+        search_dir = self.docs_dir / "search"
+        if search_dir.exists():
+            for old_file in search_dir.glob('*.json'):
+                old_file.unlink()
+                self.removed.add(old_file)
+
+        docs = []
+        for record in self.load_history_records()[0]:
+            docs.extend(self.search_docs_for_record(record))
+        if docs:
+            self.update_search_index(docs)
+        return len(docs)
+
     def update_history_json(self, date_str: str, time_str: str, questions: List[Dict]):
-        """更新历史记录 JSON 文件（三层架构）"""
+        """更新历史记录（按月分片追加 + 小体积清单）
+
+        docs/history/YYYY-MM.json 按时间顺序追加记录，历史月份不再改写；
+        docs/history.json 只保存最近的若干条记录、分片列表和统计数据，
+        首页加载的数据量不随运行时间增长。
+        """
         history_file = self.docs_dir / "history.json"
 
         # 格式化日期和时间显示
@@ -716,38 +2847,393 @@ class HTMLGenerator:
         }
 
         try:
-            # 读取现有记录
-            if history_file.exists():
-                with open(history_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    records = data.get('records') or []
+            manifest = self.load_history_manifest()
+
+            # 追加到当月分片
+            month = self.record_month(new_record)
+            shard_file = self.shard_path(month)
+            shard = {'month': month, 'records': []}
+            if shard_file.exists():
+                with open(shard_file, 'r', encoding='utf-8') as f:
+                    shard = json.load(f)
+            shard['records'].append(new_record)
+            self.write_json(shard_file, shard)
+
+            # 更新清单
+            shards = manifest.get('shards') or []
+            if shards and shards[0]['month'] == month:
+                shards[0]['count'] = len(shard['records'])
             else:
-                records = []
-
-            # 在列表开头插入新记录
-            records.insert(0, new_record)
-
-            # 保存更新后的记录
-            with open(history_file, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'records': records,
-                    'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                }, f, ensure_ascii=False, indent=2)
-
+                shards.insert(0, {'month': month, 'file': f"history/{month}.json", 'count': len(shard['records'])})
+            manifest['shards'] = shards
+            manifest['records'] = ([new_record] + (manifest.get('records') or []))[:self.history_latest]
+            manifest['total_records'] = manifest.get('total_records', 0) + 1
+            manifest['total_questions'] = manifest.get('total_questions', 0) + len(questions)
+            if manifest.get('last_date') != formatted_date:
+                manifest['active_days'] = manifest.get('active_days', 0) + 1
+                manifest['last_date'] = formatted_date
+            manifest['last_updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            manifest['page_mode'] = self.page_mode
+            self.write_json(history_file, manifest)
             log_info(f"  ✓ 已更新历史记录")
+
+            if not (self.docs_dir / "search" / "meta.json").exists():
+                # 首次生成时根据全部历史记录建立索引
+                self.rebuild_search_index()
+                log_info(f"  ✓ 已建立搜索索引")
+            elif self.update_search_index(self.search_docs_for_record(new_record)):
+                log_info(f"  ✓ 已更新搜索索引")
             return True
 
         except Exception as e:
             log_info(f"  ✗ 更新历史记录失败: {e}")
             return False
 
+def minify_css(source: str) -> str:
+    """去掉 CSS 注释和多余空白（字符串原样保留）"""
+    out = []
+    i, n = 0, len(source)
+    while i < n:
+        c = source[i]
+        if c in '"\'':
+            j = i + 1
+            while j < n and source[j] != c:
+                j += 2 if source[j] == '\\' else 1
+            out.append(source[i:j + 1])
+            i = j + 1
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+        elif c.isspace():
+            while i < n and source[i].isspace():
+                i += 1
+            prev = out[-1][-1] if out else ''
+            if prev and prev not in '{};,>:' and i < n and source[i] not in '{};,>':
+                out.append(' ')
+        else:
+            out.append(c)
+            i += 1
+    return re.sub(r';}', '}', ''.join(out))
+
+def minify_js(source: str) -> str:
+    """保守的 JS 压缩：去掉注释、缩进和空行，字符串、模板字符串和正则字面量原样保留
+
+    保留语句之间的换行，不依赖分号自动插入规则之外的任何假设。
+    """
+    out = []
+    templates = []  # 模板字符串中 ${ 所在的花括号深度
+    depth = 0
+    i, n = 0, len(source)
+
+    def last_char() -> str:
+        return out[-1][-1] if out and out[-1] else ''
+
+    def scan_template(j: int) -> int:
+        """从模板字符串内部的位置 j 开始扫描，返回结束位置（` 之后或 ${ 之后）"""
+        nonlocal depth
+        while j < n:
+            if source[j] == '\\':
+                j += 2
+            elif source[j] == '`':
+                return j + 1
+            elif source.startswith('${', j):
+                templates.append(depth)
+                depth += 1
+                return j + 2
+            else:
+                j += 1
+        return j
+
+    while i < n:
+        c = source[i]
+        if c in '"\'':
+            j = i + 1
+            while j < n and source[j] != c:
+                j += 2 if source[j] == '\\' else 1
+            out.append(source[i:j + 1])
+            i = j + 1
+        elif c == '`':
+            j = scan_template(i + 1)
+            out.append(source[i:j])
+            i = j
+        elif c == '}' and templates and depth - 1 == templates[-1]:
+            templates.pop()
+            depth -= 1
+            j = scan_template(i + 1)
+            out.append(source[i:j])
+            i = j
+        elif source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end == -1 else end
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+        elif c == '/' and (not last_char() or last_char() in '(,=:[!&|?{};+-*%<>~^\n'):
+            # 正则字面量
+            j, in_class = i + 1, False
+            while j < n and (in_class or source[j] != '/'):
+                if source[j] == '\\':
+                    j += 1
+                elif source[j] == '[':
+                    in_class = True
+                elif source[j] == ']':
+                    in_class = False
+                j += 1
+            out.append(source[i:j + 1])
+            i = j + 1
+        elif c.isspace():
+            newline = False
+            while i < n and source[i].isspace():
+                newline = newline or source[i] == '\n'
+                i += 1
+            prev, nxt = last_char(), source[i] if i < n else ''
+            if not prev or not nxt:
+                continue
+            if newline:
+                if prev not in '{;,([=:\n' and nxt not in '}),].:?':
+                    out.append('\n')
+            elif (prev.isalnum() or prev in '_$') and (nxt.isalnum() or nxt in '_$'):
+                out.append(' ')
+            elif prev in '+-' and nxt == prev:
+                out.append(' ')
+        else:
+            if c == '{':
+                depth += 1
+            elif c == '}':
+                depth -= 1
+            out.append(c)
+            i += 1
+    return ''.join(out).strip() + '\n'
+
+def minify_html(source: str) -> str:
+    """去掉 HTML 的行首缩进和空行；pre、textarea、script、style 中的内容不变"""
+    parts = re.split(r'(<(pre|textarea|script|style)\b.*?</\2>)', source, flags=re.S | re.I)
+    out = []
+    for index in range(0, len(parts), 3):
+        out.append(re.sub(r'\n\s+', '\n', parts[index]))
+        if index + 1 < len(parts):
+            out.append(parts[index + 1])
+    return ''.join(out).strip() + '\n'
+
+@lru_cache(maxsize=None)
+def load_brotli():
+    """生成 .br 文件时导入 brotli；未安装时只提示一次并返回 None"""
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        log_info("警告: brotli 未安装，跳过 .br 预压缩")
+        log_info("安装命令: pip3 install brotli")
+        return None
+
+class AssetPipeline:
+    """发布前的静态资源处理
+
+    docs/css/style.css、docs/js/app.js 仍是手工维护的源文件；发布时压缩后写入
+    docs/assets/，文件名带内容哈希，页面中的引用随之改写，浏览器可以长期缓存。
+    首页写入 history.json 的内容版本号，取代每次请求都不同的 ?t= 参数。
+    可选为 HTML/CSS/JS/JSON 生成 .gz、.br 预压缩文件，供支持静态预压缩的服务器使用。
+    """
+    # 源文件（相对 docs/）-> 输出文件名前缀
+    ASSETS = {'css/style.css': 'style', 'js/app.js': 'app'}
+    MINIFIERS = {'.css': minify_css, '.js': minify_js}
+    COMPRESS_SUFFIXES = ('.html', '.css', '.js', '.json')
+    # 只在生成器内部使用、不需要对外提供的文件
+    SKIP_FILES = ('build_manifest.json',)
+
+    def __init__(self, config: Dict, docs_dir: str = "docs"):
+        self.enabled = config.get('enabled', False)
+        self.minify = config.get('minify', True)
+        self.fingerprint = config.get('fingerprint', True)
+        self.precompress = config.get('precompress', [])
+        self.min_size = config.get('min_size', 1024)
+        self.docs_dir = Path(docs_dir)
+        self.asset_dir = self.docs_dir / "assets"
+        self.stats = {'assets': [], 'pages': 0, 'compressed': 0}
+        self.written = set()
+        self.removed = set()
+        self._assets = None
+
+    def published_assets(self) -> Dict[str, tuple]:
+        """计算各资源的发布文件名和压缩后内容（不写文件），返回 源路径 -> (文件名, 内容)"""
+        if self._assets is None:
+            self._assets = {}
+            for source, name in self.ASSETS.items():
+                source_file = self.docs_dir / source
+                if not source_file.exists():
+                    continue
+                text = source_file.read_text(encoding='utf-8')
+                if self.minify:
+                    text = self.MINIFIERS[source_file.suffix](text)
+                if self.fingerprint:
+                    digest = hashlib.sha256(text.encode('utf-8')).hexdigest()[:10]
+                    filename = f"{name}.{digest}{source_file.suffix}"
+                else:
+                    filename = f"{name}{source_file.suffix}"
+                self._assets[source] = (filename, text)
+        return self._assets
+
+    def asset_mapping(self) -> Dict[str, str]:
+        """源路径 -> 发布路径"""
+        return {source: f"assets/{filename}" for source, (filename, _) in self.published_assets().items()}
+
+    def build_assets(self) -> Dict[str, str]:
+        """压缩并输出带哈希的资源文件，返回 源路径 -> 发布路径 的映射"""
+        self.asset_dir.mkdir(parents=True, exist_ok=True)
+        for source, (filename, text) in self.published_assets().items():
+            target = self.asset_dir / filename
+            if not target.exists() or target.read_text(encoding='utf-8') != text:
+                target.write_text(text, encoding='utf-8')
+                self.written.add(target)
+            source_size = (self.docs_dir / source).stat().st_size
+            self.stats['assets'].append((source, source_size, len(text.encode('utf-8'))))
+        mapping = self.asset_mapping()
+
+        # 删除旧版本的资源文件（连同预压缩文件）
+        published = {Path(path).name for path in mapping.values()}
+        for old_file in self.asset_dir.iterdir():
+            name = old_file.stem if old_file.suffix in ('.gz', '.br') else old_file.name
+            if name not in published:
+                old_file.unlink()
+                self.removed.add(old_file)
+        return mapping
+
+    def reference_pattern(self, source: str) -> re.Pattern:
+        """匹配页面中对某个资源的引用（原路径或任意版本的发布路径）"""
+        name, suffix = self.ASSETS[source], Path(source).suffix
+        return re.compile(
+            rf'((?:href|src)=")(?:{re.escape(source)}|assets/{name}(?:\.[0-9a-f]{{10}})?{re.escape(suffix)})(")'
+        )
+
+    def data_version(self) -> Optional[str]:
+        history_file = self.docs_dir / "history.json"
+        if not history_file.exists():
+            return None
+        return hashlib.sha256(history_file.read_bytes()).hexdigest()[:10]
+
+    def render_page(self, text: str, mapping: Dict[str, str], minify: bool = True,
+                    version: Optional[str] = None) -> str:
+        """改写页面中的资源引用，可选写入数据版本号并压缩 HTML"""
+        for source, published in mapping.items():
+            text = self.reference_pattern(source).sub(rf'\g<1>{published}\g<2>', text)
+        if version is not None:
+            meta = f'<meta name="data-version" content="{version}">'
+            text, count = re.subn(r'<meta name="data-version" content="[^"]*">', meta, text)
+            if not count:
+                text = text.replace('<meta charset="UTF-8">', f'<meta charset="UTF-8">\n    {meta}', 1)
+        if minify and self.minify:
+            text = minify_html(text)
+        return text
+
+    def published_page(self, text: str) -> str:
+        """生成页面时直接使用发布后的资源引用，避免之后再改写一次（未启用时原样返回）"""
+        if not self.enabled:
+            return text
+        return self.render_page(text, self.asset_mapping())
+
+    def rewrite_page(self, page: Path, mapping: Dict[str, str], minify: bool = True,
+                     version: Optional[str] = None) -> bool:
+        """改写已有页面的资源引用和数据版本号。内容有变化时返回 True"""
+        original = page.read_text(encoding='utf-8')
+        text = self.render_page(original, mapping, minify, version)
+        if text == original:
+            return False
+        page.write_text(text, encoding='utf-8')
+        self.written.add(page)
+        return True
+
+    def compress_file(self, path: Path):
+        """为单个文件生成预压缩副本（源文件未变化时跳过）"""
+        if path.stat().st_size < self.min_size:
+            # 文件缩小到阈值以下时，删除之前为较大版本生成的预压缩副本
+            for suffix in ('.gz', '.br'):
+                target = path.with_name(path.name + suffix)
+                if target.exists():
+                    target.unlink()
+                    self.removed.add(target)
+            return
+        data = None
+        for fmt in self.precompress:
+            target = path.with_name(path.name + ('.gz' if fmt == 'gzip' else '.br'))
+            if target.exists() and target.stat().st_mtime >= path.stat().st_mtime:
+                continue
+            if data is None:
+                data = path.read_bytes()
+            if fmt == 'gzip':
+                # mtime=0 保证内容不变时输出完全相同，不产生多余的 git 变更
+                compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            else:
+                brotli = load_brotli()
+                if brotli is None:
+                    continue
+                compressed = brotli.compress(data, quality=11)
+            target.write_bytes(compressed)
+            self.written.add(target)
+            self.stats['compressed'] += 1
+
+    def precompress_site(self):
+        """为站点文件生成 .gz / .br，并清理源文件已删除的预压缩文件"""
+        for path in self.docs_dir.rglob('*'):
+            if path.suffix in ('.gz', '.br'):
+                if not path.with_suffix('').exists():
+                    path.unlink()
+                    self.removed.add(path)
+            elif (path.is_file() and path.suffix in self.COMPRESS_SUFFIXES
+                    and path.name not in self.SKIP_FILES):
+                self.compress_file(path)
+
+    def process_site(self):
+        """处理整个 docs/ 目录：资源文件、页面引用、预压缩"""
+        if not self.enabled:
+            return
+        mapping = self.build_assets()
+        # 首页是手工维护的源文件，只改写引用和数据版本号，不压缩
+        index_file = self.docs_dir / "index.html"
+        if index_file.exists() and self.rewrite_page(index_file, mapping, minify=False,
+                                                      version=self.data_version()):
+            self.stats['pages'] += 1
+        pages = [path for path in self.docs_dir.glob('*.html') if path.name != "index.html"]
+        pages.extend((self.docs_dir / "q").glob('*.html'))
+        for page in pages:
+            if self.rewrite_page(page, mapping):
+                self.stats['pages'] += 1
+        if self.precompress:
+            self.precompress_site()
+
+    def log_summary(self):
+        """输出资源处理统计"""
+        if not self.enabled:
+            return
+        for source, original, published in self.stats['assets']:
+            log_info(f"静态资源 {source}: {original / 1024:.1f}KB → {published / 1024:.1f}KB")
+        log_info(f"静态资源: 改写 {self.stats['pages']} 个页面，生成 {self.stats['compressed']} 个预压缩文件")
+
 class GitHubPagesPublisher:
-    """GitHub Pages 发布器"""
-    def __init__(self, config: Dict):
+    """GitHub Pages 发布器
+
+    每次运行只把本次生成或删除的文件写入发布队列（publish_queue/ 下每次运行一个 JSON 文件），
+    由后台进程（publish 子命令）按文件清单逐次 git add / commit，再统一推送一次；
+    推送失败时按指数退避重试，仍未成功的提交留在本地，下次推送时一并发送。
+    publish.mode 为 sync 时在当前进程中处理队列。
+    """
+    # 单条 git 命令携带的路径数量上限，避免超出命令行长度限制
+    PATHS_PER_COMMAND = 200
+
+    def __init__(self, config: Dict, metrics: Optional[RunMetrics] = None, config_file: Optional[str] = None):
+        self.metrics = metrics
+        self.config_file = config_file
         self.enabled = config.get('enabled', False)
         self.username = config.get('username', '')
         self.repo = config.get('repo', 'leetcode')
         self.site_url = config.get('site_url', '')
+        publish_config = config.get('publish', {})
+        self.mode = publish_config.get('mode', 'background')
+        self.queue_dir = Path(publish_config.get('queue_dir', 'publish_queue'))
+        self.log_file = publish_config.get('log_file', 'publish.log')
+        self.retries = publish_config.get('retries', 5)
+        self.backoff = publish_config.get('backoff', 30)
+        self.max_backoff = publish_config.get('max_backoff', 600)
+        self.push_timeout = publish_config.get('push_timeout', 120)
 
     def is_available(self) -> bool:
         """检查是否已配置"""
@@ -770,17 +3256,8 @@ class GitHubPagesPublisher:
         except Exception:
             return False
 
-    def git_add_commit_push(self, date_str: str, questions: List[Dict] = None) -> bool:
-        """添加、提交并推送到 GitHub"""
-        if not self.is_available():
-            log_info("  ⚠ GitHub Pages 未启用或未配置")
-            return False
-
-        if not self.check_git_initialized():
-            log_info("  ⚠ Git 仓库未初始化，请先运行 git init")
-            log_info("  提示: 查看 GITHUB_PAGES_SETUP.md 了解详细配置步骤")
-            return False
-
+    def commit_message(self, date_str: str, questions: List[Dict] = None) -> str:
+        """生成详细的 commit message"""
         formatted_date = f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:]}"
         formatted_time = datetime.now().strftime("%H:%M:%S")
 
@@ -819,66 +3296,1168 @@ class GitHubPagesPublisher:
         else:
             # 降级方案：简单的 commit message
             commit_message = f"📝 {formatted_date} {formatted_time} | Add LeetCode questions\n\n🤖 Auto-generated by LeetCode Daily Script"
+        return commit_message
 
-        commands = [
-            ['git', 'add', 'docs/'],
-            ['git', 'add', 'leetcode_questions/'],
-            ['git', 'commit', '-m', commit_message],
-            ['git', 'push', 'origin', 'main']
-        ]
+    def enqueue(self, date_str: str, questions: List[Dict], paths, removed=()) -> bool:
+        """把本次运行生成和删除的文件加入发布队列，并交给后台进程提交、推送"""
+        if not self.is_available():
+            log_info("  ⚠ GitHub Pages 未启用或未配置")
+            return False
 
+        if not self.check_git_initialized():
+            log_info("  ⚠ Git 仓库未初始化，请先运行 git init")
+            log_info("  提示: 查看 GITHUB_PAGES_SETUP.md 了解详细配置步骤")
+            return False
+
+        removed = set(removed) - set(paths)
+        entry = {
+            'message': self.commit_message(date_str, questions),
+            'paths': sorted(Path(os.path.relpath(path)).as_posix() for path in paths),
+            'removed': sorted(Path(os.path.relpath(path)).as_posix() for path in removed),
+            'queued_at': datetime.now().isoformat(timespec='seconds')
+        }
         try:
-            for cmd in commands:
-                log_info(f"  执行: {' '.join(cmd)}")
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=30
-                )
+            self.queue_dir.mkdir(parents=True, exist_ok=True)
+            entry_file = self.queue_dir / f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.json"
+            tmp_file = entry_file.with_suffix('.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, entry_file)
+        except Exception as e:
+            log_info(f"  ✗ 写入发布队列失败: {e}")
+            return False
+        log_info(f"  ✓ 已加入发布队列: {len(entry['paths'])} 个文件，{len(entry['removed'])} 个删除")
+
+        if self.mode == 'sync':
+            return self.process_queue()
+        return self.start_worker()
+
+    def start_worker(self) -> bool:
+        """启动独立会话中的后台发布进程，主流程不等待推送结束"""
+        cmd = [sys.executable, os.path.abspath(__file__)]
+        if self.config_file:
+            cmd += ['--config', os.path.abspath(self.config_file)]
+        cmd.append('publish')
+        try:
+            with open(self.log_file, 'a', encoding='utf-8') as log:
+                subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                                 start_new_session=True)
+        except Exception as e:
+            log_info(f"  ✗ 启动后台发布进程失败: {e}")
+            return False
+        log_info(f"  ✓ 后台发布进程已启动，日志: {self.log_file}")
+        return True
 
-                if result.returncode != 0:
-                    # git commit 如果没有变更会返回非 0，这是正常的
-                    if 'nothing to commit' in result.stdout or 'nothing to commit' in result.stderr:
-                        log_info(f"  ℹ️  没有需要提交的变更")
+    @contextmanager
+    def queue_lock(self):
+        """同一时间只允许一个进程处理队列；后启动的进程等前一个结束后继续处理新加入的记录"""
+        import fcntl
+        self.queue_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.queue_dir / '.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def run_git(self, args: List[str], timeout: int = 30) -> subprocess.CompletedProcess:
+        cmd = ['git', '--literal-pathspecs'] + args
+        timer = self.metrics.span(f'git_{args[0]}', command=' '.join(cmd[:4])) if self.metrics else nullcontext({})
+        with timer as span:
+            try:
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                result = subprocess.CompletedProcess(cmd, -1, '', f'超过 {timeout} 秒未完成')
+            span['ok'] = result.returncode == 0
+        return result
+
+    def commit_entry(self, entry: Dict) -> bool:
+        """按文件清单暂存并提交一次运行的结果"""
+        existing = [path for path in entry['paths'] if os.path.exists(path)]
+        missing = entry['removed'] + [path for path in entry['paths'] if not os.path.exists(path)]
+        step = self.PATHS_PER_COMMAND
+        for i in range(0, len(existing), step):
+            result = self.run_git(['add', '--'] + existing[i:i + step])
+            if result.returncode != 0:
+                log_info(f"  ✗ git add 失败: {result.stderr.strip()}")
+                return False
+        for i in range(0, len(missing), step):
+            result = self.run_git(['rm', '--cached', '--ignore-unmatch', '-q', '--'] + missing[i:i + step])
+            if result.returncode != 0:
+                log_info(f"  ✗ git rm 失败: {result.stderr.strip()}")
+                return False
+
+        result = self.run_git(['commit', '-m', entry['message']])
+        if result.returncode != 0:
+            # git commit 如果没有变更会返回非 0，这是正常的
+            if 'nothing to commit' in result.stdout or 'nothing to commit' in result.stderr:
+                log_info(f"  ℹ️  没有需要提交的变更")
+                return True
+            log_info(f"  ✗ git commit 失败: {result.stderr.strip()}")
+            return False
+        log_info(f"  ✓ 已提交: {entry['message'].splitlines()[0]}")
+        return True
+
+    def push(self) -> bool:
+        """推送到 GitHub，失败时按指数退避重试"""
+        for attempt in range(self.retries + 1):
+            result = self.run_git(['push', 'origin', 'main'], timeout=self.push_timeout)
+            if result.returncode == 0:
+                log_info(f"  ✓ 已推送到 GitHub")
+                if self.site_url:
+                    log_info(f"  🌐 访问: {self.site_url}")
+                return True
+            if attempt == self.retries:
+                break
+            delay = min(self.backoff * 2 ** attempt, self.max_backoff) * random.uniform(0.5, 1.0)
+            reason = (result.stderr.strip().splitlines() or ['未知错误'])[0]
+            log_info(f"  ⚠ 推送失败（{reason}），{delay:.0f} 秒后第 {attempt + 1}/{self.retries} 次重试")
+            time.sleep(delay)
+        log_info(f"  ✗ 推送失败，提交保留在本地，下次发布时一并推送")
+        return False
+
+    def process_queue(self) -> bool:
+        """提交队列中的所有记录（每次运行一个提交），再合并为一次推送"""
+        with self.queue_lock():
+            while True:
+                for entry_file in sorted(self.queue_dir.glob('*.json')):
+                    try:
+                        with open(entry_file, 'r', encoding='utf-8') as f:
+                            entry = json.load(f)
+                    except Exception as e:
+                        log_info(f"  ✗ 读取发布队列失败: {entry_file.name}: {e}")
+                        entry_file.rename(entry_file.with_suffix('.bad'))
                         continue
-                    else:
-                        log_info(f"  ✗ 命令失败: {result.stderr}")
+                    if not self.commit_entry(entry):
                         return False
+                    entry_file.unlink()
 
-            log_info(f"  ✓ 已推送到 GitHub")
-            if self.site_url:
-                log_info(f"  🌐 访问: {self.site_url}")
-            return True
+                pushed = self.push()
+                # 推送期间有新的运行加入队列时继续处理，否则这些记录要等到下一次运行
+                if not pushed or not any(self.queue_dir.glob('*.json')):
+                    return pushed
 
-        except subprocess.TimeoutExpired:
-            log_info(f"  ✗ Git 操作超时")
-            return False
+class RunJournal:
+    """单次运行的进度记录（用于 --resume 断点续跑）
+
+    记录本次选中的题目以及每道题完成到哪个阶段（selected → detail → ai → saved），
+    题目详情和 AI 解答等中间结果一并写入；发布阶段（html → history_json → published）
+    同样逐步记录。运行中断后使用 --resume 从上次完成的阶段继续，不重新选题，
+    已生成的 AI 解答也不会重新生成。每次更新都原子写入整个文件。
+    """
+    QUESTION_STAGES = ('selected', 'detail', 'ai', 'saved')
+    RUN_STAGES = ('html', 'history_json', 'published')
+
+    def __init__(self, config: Dict):
+        self.enabled = config.get('enabled', True)
+        self.journal_file = config.get('file', 'run_journal.json')
+        self.data = None
+
+    @property
+    def active(self) -> bool:
+        return self.enabled and self.data is not None
+
+    @property
+    def date_str(self) -> str:
+        return self.data['date_str']
+
+    def load_unfinished(self) -> Optional[Dict]:
+        """读取上次未完成的运行记录（已完成或不存在时返回 None）"""
+        if not self.enabled or not os.path.exists(self.journal_file):
+            return None
+        try:
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
         except Exception as e:
-            log_info(f"  ✗ Git 操作失败: {e}")
-            return False
+            log_info(f"警告: 加载运行进度记录失败: {e}")
+            return None
+        if data.get('status') == 'completed':
+            return None
+        return data
+
+    def start(self, date_str: str, questions: List[CatalogEntry]):
+        """开始新的运行（覆盖之前的记录）"""
+        self.data = {
+            'run_id': datetime.now().strftime('%Y%m%d_%H%M%S'),
+            'date_str': date_str,
+            'status': 'running',
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'questions': [{'entry': q.to_row(), 'stage': 'selected'} for q in questions],
+            'stages': {}
+        }
+        self.save()
+
+    def resume(self, data: Dict):
+        self.data = data
+        self.data['resumed_at'] = datetime.now().isoformat(timespec='seconds')
+        self.save()
+
+    def selected_questions(self) -> List[CatalogEntry]:
+        return [CatalogEntry.from_row(item['entry']) for item in self.data['questions']]
+
+    def question(self, index: int) -> Dict:
+        """第 index 道题（从 1 开始）的进度；未启用时返回空字典"""
+        if not self.active:
+            return {}
+        return self.data['questions'][index - 1]
+
+    def record(self, index: int, stage: str, **artifacts):
+        """记录题目完成的阶段和中间结果；保存后不再需要中间结果"""
+        if not self.active:
+            return
+        item = self.data['questions'][index - 1]
+        item['stage'] = stage
+        if stage == 'saved':
+            item.pop('detail', None)
+            item.pop('ai_solution', None)
+        item.update(artifacts)
+        self.save()
+
+    def stage(self, name: str) -> Optional[Dict]:
+        """发布阶段的结果；未完成时返回 None"""
+        if not self.active:
+            return None
+        return self.data['stages'].get(name)
+
+    def mark(self, name: str, **fields):
+        if not self.active:
+            return
+        self.data['stages'][name] = fields
+        self.save()
+
+    def progress(self) -> str:
+        """各阶段题目数量，例如 "saved 2, detail 1" """
+        counts = {}
+        for item in self.data['questions']:
+            counts[item['stage']] = counts.get(item['stage'], 0) + 1
+        parts = [f"{stage} {counts[stage]}" for stage in reversed(self.QUESTION_STAGES) if stage in counts]
+        parts.extend(stage for stage in self.RUN_STAGES if stage in self.data['stages'])
+        return ', '.join(parts)
+
+    def complete(self):
+        if not self.active:
+            return
+        self.data['status'] = 'completed'
+        self.data['finished_at'] = datetime.now().isoformat(timespec='seconds')
+        self.save()
+
+    def save(self):
+        try:
+            tmp_file = f"{self.journal_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False)
+            os.replace(tmp_file, self.journal_file)
+        except Exception as e:
+            log_info(f"警告: 保存运行进度记录失败: {e}")
+
+def process_selected_questions(
+    selected_questions: List[Dict],
+    fetcher: LeetCodeFetcher,
+    ai_generator: AISolutionGenerator,
+    output_dir: str,
+    history: QuestionHistory,
+    logger: ExecutionLogger,
+    pipeline_config: Dict,
+    metrics: Optional[RunMetrics] = None,
+    journal: Optional[RunJournal] = None,
+    report_every: int = 0,
+    prefetch: bool = False
+) -> List[str]:
+    """分阶段并发处理题目：详情获取 → AI 解答 → 保存
+
+    详情获取和 AI 生成各自使用独立的有界线程池，题目完成后立即保存；
+    保存、历史记录、执行日志和运行进度只在主线程中更新，无需加锁。
+    每道题的各阶段耗时记录到 metrics（未传入时不导出）；
+    journal 中已完成的阶段直接使用记录的结果，从下一阶段继续；
+    report_every 大于 0 时每完成 report_every 道题输出一次吞吐量和预计剩余时间；
+    prefetch 为 True 时只完成详情和 AI 阶段并记录到 journal，保存留给之后的运行。
+    返回按题目序号排列的已保存文件路径。
+    """
+    metrics = metrics or RunMetrics({'enabled': False})
+    journal = journal or RunJournal({'enabled': False})
+    total = len(selected_questions)
+    detail_workers = max(1, int(pipeline_config.get('detail_workers', 4)))
+    ai_workers = max(1, int(pipeline_config.get('ai_workers', 3)))
+    ai_enabled = ai_generator.is_available()
+    date_str = journal.date_str if journal.active else datetime.now().strftime("%Y%m%d")
+
+    saved = {}  # 题目序号 -> 文件路径
+    pending = {}  # future -> (阶段, 题目序号, 题目, 详情)
+    finished = [0]  # 本次运行中处理完成（成功或失败）的题目数
+    todo = total - sum(1 for i in range(1, total + 1) if journal.question(i).get('stage') == 'saved')
+    started = time.time()
+
+    def report():
+        finished[0] += 1
+        if not report_every or (finished[0] % report_every and finished[0] != todo):
+            return
+        rate = finished[0] / max(time.time() - started, 1e-6)
+        remaining = (todo - finished[0]) / rate
+        log_info(f"  进度 {finished[0]}/{todo}，累计成功 {len(saved)} 道"
+                 f"（{rate * 60:.1f} 题/分钟，预计剩余 {remaining / 60:.1f} 分钟）")
+
+    def timed(stage, q, fn, *args, **kwargs):
+        # 在工作线程中计时，HTTP 响应钩子会把字节数和重试次数计入该阶段
+        with metrics.span(stage, q['questionFrontendId']) as span:
+            result = fn(*args, **kwargs)
+            span['ok'] = bool(result)
+            return result
+
+    def save(i, q, detail, ai_solution):
+        if prefetch:
+            report()
+            return
+        filepath = os.path.join(output_dir, markdown_filename(detail, date_str))
+        with metrics.span('save', q['questionFrontendId']) as span:
+            span['ok'] = save_as_markdown(detail, ai_solution, output_dir, date_str)
+            if span['ok']:
+                span['bytes'] = os.path.getsize(filepath)
+        if span['ok']:
+            history.add(q['questionId'])
+            logger.add_result(i, True, q['title'])
+            journal.record(i, 'saved', file=filepath)
+            saved[i] = filepath
+        else:
+            logger.add_result(i, False, q['title'])
+
+        # 流式生成的中间文件在最终文件保存后删除
+        if os.path.exists(filepath + '.partial'):
+            os.remove(filepath + '.partial')
+        report()
+
+    with futures.ThreadPoolExecutor(max_workers=detail_workers, thread_name_prefix='detail') as detail_pool, \
+            futures.ThreadPoolExecutor(max_workers=ai_workers, thread_name_prefix='ai') as ai_pool:
+
+        def submit_ai(i, q, detail):
+            log_info(f"[{i}/{total}] 正在生成 AI 解答...")
+            ai_future = ai_pool.submit(
+                timed, 'ai', q,
+                ai_generator.generate_solution,
+                detail,
+                partial_file=os.path.join(output_dir, markdown_filename(detail, date_str) + '.partial')
+            )
+            pending[ai_future] = ('ai', i, q, detail)
+
+        for i, q in enumerate(selected_questions, 1):
+            log_info(f"[{i}/{total}] {q['difficulty']} - {q['questionFrontendId']}. {q['title']}")
+            progress = journal.question(i)
+            stage = progress.get('stage', 'selected')
+            if stage == 'saved' and os.path.exists(progress['file']):
+                log_info(f"[{i}/{total}] ✓ 上次运行已保存，跳过")
+                logger.add_result(i, True, q['title'])
+                saved[i] = progress['file']
+            elif stage == 'ai' and prefetch:
+                log_info(f"[{i}/{total}] ✓ 已预取")
+            elif stage == 'ai':
+                log_info(f"[{i}/{total}] ✓ 使用上次运行的 AI 解答")
+                save(i, q, progress['detail'], progress.get('ai_solution'))
+            elif stage == 'detail' and ai_enabled:
+                submit_ai(i, q, progress['detail'])
+            else:
+                future = detail_pool.submit(timed, 'detail', q, fetcher.get_question_detail, q['titleSlug'])
+                pending[future] = ('detail', i, q, None)
+
+        while pending:
+            done, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+            for future in done:
+                stage, i, q, detail = pending.pop(future)
+                prefix = f"[{i}/{total}]"
+
+                try:
+                    result = future.result()
+                except Exception as e:
+                    log_info(f"{prefix} ✗ {'获取详情' if stage == 'detail' else 'AI 解答生成'}异常: {e}")
+                    result = None
+
+                if stage == 'detail':
+                    detail = result
+                    if not detail:
+                        log_info(f"{prefix} ✗ 跳过（获取失败）")
+                        logger.add_result(i, False, q['title'])
+                        report()
+                        continue
+                    journal.record(i, 'detail', detail=detail)
+
+                    # 详情就绪后进入 AI 阶段
+                    if ai_enabled:
+                        submit_ai(i, q, detail)
+                        continue
+                    ai_solution = None
+                else:
+                    ai_solution = result
+                    if ai_solution:
+                        log_info(f"{prefix} ✓ AI 解答已生成")
+                        journal.record(i, 'ai', ai_solution=ai_solution)
+
+                save(i, q, detail, ai_solution)
+
+    log_info("")
+    return [saved[i] for i in sorted(saved)]
+
+def warm_question_store(
+    fetcher: LeetCodeFetcher,
+    slugs: List[str],
+    workers: int = 4,
+    revalidate: bool = False
+) -> Dict:
+    """批量预热或重新校验题目详情存储"""
+    store = fetcher.question_store
+    targets = list(slugs) if revalidate else store.pending_slugs(slugs)
+    summary = {'total': len(slugs), 'fetched': 0, 'changed': 0, 'failed': 0,
+               'skipped': len(slugs) - len(targets)}
+    if not targets:
+        return summary
+
+    log_info(f"需要获取 {len(targets)} 道题目详情（跳过 {summary['skipped']} 道未过期的题目）")
+
+    def fetch(slug):
+        question = fetcher.fetch_question_detail(slug)
+        if not question:
+            return None
+        return store.put(slug, question)
+
+    start = time.time()
+    with futures.ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='warm') as pool:
+        for done, changed in enumerate(pool.map(fetch, targets), 1):
+            if changed is None:
+                summary['failed'] += 1
+            else:
+                summary['fetched'] += 1
+                summary['changed'] += int(changed)
+            if done % 50 == 0 or done == len(targets):
+                rate = done / max(time.time() - start, 1e-6)
+                log_info(f"  进度 {done}/{len(targets)} ({rate:.1f} 题/秒)")
+
+    return summary
+
+def publish_pages(
+    config: Dict,
+    config_file: Optional[str],
+    saved_files: List[str],
+    date_str: str,
+    selected_questions: List[CatalogEntry],
+    journal: RunJournal,
+    metrics: RunMetrics,
+    record_size: int = 0
+):
+    """生成 HTML、更新历史记录 JSON、处理静态资源并加入发布队列
+
+    所有题目一次性完成各阶段；record_size 大于 0 时每 record_size 道题写成一条历史记录
+    （批量补题时避免单条记录过大）。已完成的阶段记录在 journal 中，续跑时跳过。
+    """
+    github_config = config.get('github_pages', {})
+    if not github_config.get('enabled', False) or not saved_files:
+        return
+
+    log_info("正在生成 GitHub Pages...")
+
+    # 生成 HTML（三层架构）
+    assets = AssetPipeline(config.get('assets', {}), "docs")
+    html_gen = HTMLGenerator(
+        "docs",
+        github_config.get('history_latest_records', 20),
+        MarkdownRenderer(config.get('render', {})),
+        github_config.get('page_mode', 'full'),
+        assets
+    )
+    def generate_records(files: List[str], taken=()) -> List[Dict]:
+        size = record_size or len(files)
+        moment = datetime.now()
+        taken = set(taken)
+        generated = []
+        with metrics.span('html', questions=len(files)) as span:
+            for offset in range(0, len(files), size):
+                # 每条记录使用不同的时间戳（记录 ID 为 日期_时分秒），避开已有记录的时间戳
+                while moment.strftime("%H%M%S") in taken:
+                    moment += timedelta(seconds=1)
+                time_str = moment.strftime("%H%M%S")
+                taken.add(time_str)
+                chunk = files[offset:offset + size]
+                questions = html_gen.convert_markdown_to_html(chunk, date_str, time_str)
+                if questions:
+                    generated.append({'time_str': time_str, 'questions': questions, 'files': chunk})
+            span['ok'] = bool(generated)
+        html_gen.renderer.log_summary()
+        return generated
+
+    html_stage = journal.stage('html')
+    pending_files = []
+    if html_stage:
+        # 续跑时沿用上次的时间戳，页面文件名和历史记录保持一致
+        records = list(html_stage['records'])
+        html_gen.written.update(Path(path) for path in html_stage['written'])
+        covered = set()
+        for record in records:
+            covered.update(record.get('files') or [
+                html_gen.manifest.get(question['file'], {}).get('source') for question in record['questions']
+            ])
+        # 上次失败、本次重试后才保存的题目还没有页面，单独生成新的记录
+        pending_files = [path for path in saved_files if path not in covered]
+        if pending_files:
+            log_info(f"✓ HTML 已在上次运行中生成，补充生成 {len(pending_files)} 道新保存的题目")
+            records.extend(generate_records(pending_files, {record['time_str'] for record in records}))
+            journal.mark('html', records=records, written=sorted(map(str, html_gen.written)))
+        else:
+            log_info("✓ HTML 已在上次运行中生成")
+    else:
+        records = generate_records(saved_files)
+        if records:
+            journal.mark('html', records=records, written=sorted(map(str, html_gen.written)))
+
+    if not records:
+        return
+
+    # 更新历史记录 JSON（重复追加会产生重复记录，续跑时只追加尚未写入的记录）
+    history_stage = journal.stage('history_json') or {}
+    appended = history_stage.get('records', len(html_stage['records']) if history_stage else 0)
+    # 续跑时本次没有重新生成的文件仍需要发布
+    html_gen.written.update(Path(path) for path in history_stage.get('written', []))
+    if appended < len(records):
+        with metrics.span('history_json', records=len(records) - appended):
+            for record in records[appended:]:
+                html_gen.update_history_json(date_str, record['time_str'], record['questions'])
+        journal.mark('history_json', records=len(records), written=sorted(map(str, html_gen.written)))
+
+    # 压缩、加指纹并预压缩静态资源
+    with metrics.span('assets'):
+        assets.process_site()
+    assets.log_summary()
+
+    # 推送到 GitHub（只暂存本次生成和删除的文件，提交和推送交给后台进程）
+    publisher = GitHubPagesPublisher(github_config, metrics, config_file)
+    if publisher.is_available() and (journal.stage('published') is None or pending_files):
+        log_info("")
+        log_info("正在推送到 GitHub...")
+        with metrics.span('publish'):
+            published = publisher.enqueue(
+                date_str,
+                selected_questions,
+                set(saved_files) | html_gen.written | assets.written,
+                html_gen.removed | assets.removed
+            )
+        if published:
+            journal.mark('published')
+    elif publisher.is_available():
+        log_info("✓ 上次运行已加入发布队列")
+    else:
+        log_info("  ⚠ GitHub Pages 未完全配置，跳过推送")
+        log_info("  提示: 查看 GITHUB_PAGES_SETUP.md 了解配置步骤")
+
+    log_info("")
+    log_info("=" * 60)
+
+def run_warm_store(config: Dict, args: argparse.Namespace):
+    """warm-store 子命令：批量预热题目详情存储"""
+    store = QuestionStore(config.get('question_store', {}))
+    if not store.enabled:
+        log_info("❌ 题目详情存储未启用")
+        return
+
+    http_pool = HTTPSessionPool(config.get('http', {}))
+    fetcher = LeetCodeFetcher(
+        CatalogCache(config.get('catalog', {})),
+        store,
+        http_pool,
+        config.get('leetcode_url', 'https://leetcode.cn')
+    )
+    if args.slugs:
+        slugs = args.slugs
+    else:
+        questions = fetcher.get_all_questions(offline=args.offline)
+        if args.difficulty:
+            questions = filter_by_difficulty(questions, args.difficulty.capitalize())
+        slugs = [q['titleSlug'] for q in questions]
+    if args.limit:
+        slugs = slugs[:args.limit]
+
+    summary = warm_question_store(fetcher, slugs, args.workers, args.revalidate)
+    stats = store.get_stats()
+    log_info(f"✓ 完成: 获取 {summary['fetched']} 道，内容变化 {summary['changed']} 道，"
+             f"失败 {summary['failed']} 道，跳过 {summary['skipped']} 道")
+    log_info(f"本地存储: {stats['questions']} 道题目，{stats['blobs']} 份内容")
+    http_pool.log_stats()
+
+def run_build(config: Dict, args: argparse.Namespace):
+    """build 子命令：增量重建 GitHub Pages 页面"""
+    renderer = MarkdownRenderer(config.get('render', {}))
+    if not renderer.available():
+        log_info("❌ markdown2 未安装，无法生成 HTML")
+        return
+
+    github_config = config.get('github_pages', {})
+    assets = AssetPipeline(config.get('assets', {}), "docs")
+    html_gen = HTMLGenerator(
+        "docs",
+        github_config.get('history_latest_records', 20),
+        renderer,
+        github_config.get('page_mode', 'full'),
+        assets
+    )
+    log_info("正在增量构建 GitHub Pages...")
+    summary = html_gen.build_site(config['output_dir'], force=args.force, dry_run=args.dry_run)
+    log_info(f"✓ 重新生成 {summary['rebuilt']} 个页面，{summary['fresh']} 个页面无需更新，"
+             f"删除 {summary['removed']} 个孤立页面，{summary['missing_source']} 个页面找不到源文件")
+    renderer.log_summary()
+
+    if not args.dry_run:
+        if summary['history_complete']:
+            doc_count = html_gen.rebuild_search_index()
+            log_info(f"✓ 搜索索引已重建，共 {doc_count} 道题目")
+        else:
+            log_info("⚠ 历史记录不完整，保留现有搜索索引")
+        corpus = CorpusIndex(config.get('corpus_index', {}))
+        if corpus.enabled:
+            corpus_summary = corpus.refresh(config['output_dir'])
+            log_info(f"✓ 题库索引: 更新 {corpus_summary['indexed']} 个文件，"
+                     f"{corpus_summary['unchanged']} 个无变化，删除 {corpus_summary['removed']} 个")
+        assets.process_site()
+        assets.log_summary()
+
+def parse_date_arg(value: str, end: bool = False) -> str:
+    """把 YYYYMMDD、YYYY-MM-DD 或 YYYY-MM 转换为 YYYYMMDD（只给月份时取当月第一天或最后一天）"""
+    digits = value.replace('-', '')
+    if not re.fullmatch(r'\d{6}|\d{8}', digits):
+        raise ValueError(f"无法识别的日期: {value}")
+    if len(digits) == 6:
+        digits += '31' if end else '01'
+    return digits
+
+def run_query(config: Dict, args: argparse.Namespace):
+    """query 子命令：查询本地题库索引
+
+    目录有变化（或指定 --refresh）时先增量刷新索引，结果直接输出到标准输出。
+    """
+    corpus = CorpusIndex(config.get('corpus_index', {}))
+    if not corpus.enabled:
+        print("题库索引未启用", file=sys.stderr)
+        return
+    source_dir = config['output_dir']
+    if args.refresh or not corpus.is_current(source_dir):
+        corpus.refresh(source_dir)
+
+    try:
+        since = parse_date_arg(args.month or args.since) if (args.month or args.since) else None
+        until = parse_date_arg(args.month or args.until, end=True) if (args.month or args.until) else None
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return
+    rows = corpus.query(
+        numbers=args.numbers,
+        slug=args.slug,
+        difficulty=args.difficulty,
+        tags=[tag.strip() for tag in args.tags.split(',') if tag.strip()] if args.tags else (),
+        since=since,
+        until=until,
+        has_ai=args.ai,
+        limit=args.limit
+    )
+
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+        return
+    for row in rows:
+        print(f"{row['date']}  {row['number']:>8}  {row['difficulty']:<6}  {'AI' if row['has_ai'] else '--'}  "
+              f"{row['title']}  [{', '.join(row['tags'])}]")
+    print(f"共 {len(rows)} 道题目", file=sys.stderr)
+
+def parse_id_ranges(spec: str) -> List[tuple]:
+    """解析题号范围，例如 "1-100,200,305-310" """
+    ranges = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        low, _, high = part.partition('-')
+        try:
+            ranges.append((int(low), int(high or low)))
+        except ValueError:
+            raise ValueError(f"无效的题号范围: {part}")
+    return ranges
+
+def select_backfill_questions(
+    all_questions: List[CatalogEntry],
+    history: QuestionHistory,
+    fetcher: LeetCodeFetcher,
+    ids: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    difficulty_counts: Optional[Dict[str, int]] = None,
+    limit: int = 0,
+    workers: int = 4
+) -> List[CatalogEntry]:
+    """按条件选出需要补充的题目（始终排除历史记录中已有的题目）
+
+    条件可以组合：题号范围、难度数量（每个难度随机选出指定数量）、标签；
+    都不指定时选出所有尚未生成过的题目。标签在题目详情中，需要先获取详情
+    （已有本地存储时直接读取）。结果按题号排序。
+    """
+    candidates = [q for q in all_questions if not history.contains(q.questionId)]
+
+    if ids:
+        ranges = parse_id_ranges(ids)
+
+        def in_ranges(q: CatalogEntry) -> bool:
+            if not q.questionFrontendId.isdigit():
+                return False
+            number = int(q.questionFrontendId)
+            return any(low <= number <= high for low, high in ranges)
+
+        candidates = [q for q in candidates if in_ranges(q)]
+
+    if tags:
+        wanted = {tag.lower() for tag in tags}
+        log_info(f"按标签筛选需要题目详情，正在检查 {len(candidates)} 道题目...")
+
+        def matches(q: CatalogEntry) -> bool:
+            detail = fetcher.get_question_detail(q.titleSlug)
+            names = {(tag.get('name') or '').lower() for tag in ((detail or {}).get('topicTags') or [])}
+            return bool(names & wanted)
+
+        with futures.ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='tags') as pool:
+            candidates = [q for q, ok in zip(candidates, pool.map(matches, candidates)) if ok]
+
+    if difficulty_counts:
+        selected = []
+        for difficulty, count in difficulty_counts.items():
+            available = filter_by_difficulty(candidates, difficulty.capitalize())
+            if len(available) < count:
+                log_info(f"  ⚠ {difficulty.capitalize()} 难度可用题目不足 ({len(available)}/{count})")
+            selected.extend(random.sample(available, min(count, len(available))))
+        candidates = selected
+
+    candidates.sort(key=lambda q: (not q.questionFrontendId.isdigit(),
+                                   int(q.questionFrontendId) if q.questionFrontendId.isdigit() else 0,
+                                   q.questionFrontendId))
+    if limit > 0:
+        candidates = candidates[:limit]
+    return candidates
+
+def run_backfill(config: Dict, args: argparse.Namespace):
+    """backfill 子命令：批量生成题目
+
+    题目逐个经过 详情 → AI 解答 → 保存，进度写入 backfill_journal.json（可用 --resume 继续）；
+    HTML、history.json 和 git 提交在全部题目处理完后统一执行一次。
+    """
+    backfill_config = config.get('backfill', {})
+    metrics = RunMetrics(config.get('metrics', {}))
+    logger = ExecutionLogger("execution.log")
+    history = QuestionHistory(
+        config['history_file'],
+        config.get('history_compact_threshold', 50)
+    )
+    http_pool = HTTPSessionPool(config.get('http', {}))
+    fetcher = LeetCodeFetcher(
+        CatalogCache(config.get('catalog', {})),
+        QuestionStore(config.get('question_store', {})),
+        http_pool,
+        config.get('leetcode_url', 'https://leetcode.cn')
+    )
+    journal = RunJournal({'enabled': True, 'file': backfill_config.get('journal_file', 'backfill_journal.json')})
+    unfinished = journal.load_unfinished()
+
+    if args.resume and unfinished:
+        journal.resume(unfinished)
+        selected_questions = journal.selected_questions()
+        date_str = journal.date_str
+        log_info(f"✓ 继续上次未完成的批量补题 {unfinished['run_id']}（{journal.progress()}）")
+    else:
+        if unfinished and not args.dry_run:
+            log_info(f"⚠ 上次批量补题 {unfinished['run_id']} 未完成（可使用 --resume 继续），本次开始新的补题")
+
+        log_info("正在获取题目列表...")
+        all_questions = fetcher.get_all_questions(offline=args.offline)
+        if not all_questions:
+            log_info("❌ 无法获取题目列表")
+            return
+
+        difficulty_counts = {name: count for name, count in
+                             (('easy', args.easy), ('medium', args.medium), ('hard', args.hard))
+                             if count is not None}
+        try:
+            selected_questions = select_backfill_questions(
+                all_questions,
+                history,
+                fetcher,
+                ids=args.ids,
+                tags=[tag.strip() for tag in args.tags.split(',') if tag.strip()] if args.tags else None,
+                difficulty_counts=difficulty_counts or None,
+                limit=args.limit,
+                workers=backfill_config.get('detail_workers', 8)
+            )
+        except ValueError as e:
+            log_info(f"❌ {e}")
+            return
+
+        if not selected_questions:
+            log_info("❌ 没有符合条件且尚未生成过的题目")
+            return
+
+        by_difficulty = {}
+        for q in selected_questions:
+            by_difficulty[q.difficulty] = by_difficulty.get(q.difficulty, 0) + 1
+        log_info(f"✓ 选出 {len(selected_questions)} 道题目（" +
+                 ', '.join(f"{name} {count}" for name, count in sorted(by_difficulty.items())) + "）")
+
+        if args.dry_run:
+            for q in selected_questions:
+                log_info(f"  {q.questionFrontendId}. {q.titleSlug} ({q.difficulty})")
+            return
+
+        date_str = datetime.now().strftime("%Y%m%d")
+        journal.start(date_str, selected_questions)
+
+    ai_generator = AISolutionGenerator(
+        config.get('deepseek', {}),
+        http_pool,
+        AISolutionCache(config.get('ai_cache', {}))
+    )
+    pipeline_config = dict(config.get('pipeline', {}))
+    pipeline_config['detail_workers'] = backfill_config.get('detail_workers', 8)
+    pipeline_config['ai_workers'] = args.workers or backfill_config.get('ai_workers', pipeline_config.get('ai_workers', 3))
+    log_info(f"并发: 详情 {pipeline_config['detail_workers']}，AI 解答 {pipeline_config['ai_workers']}")
+    log_info("")
+
+    already_saved = sum(1 for item in journal.data['questions'] if item['stage'] == 'saved')
+    start = time.time()
+    try:
+        saved_files = process_selected_questions(
+            selected_questions,
+            fetcher,
+            ai_generator,
+            config['output_dir'],
+            history,
+            logger,
+            pipeline_config,
+            metrics,
+            journal,
+            report_every=backfill_config.get('report_every', 10)
+        )
+    finally:
+        ai_generator.close()
+    elapsed = time.time() - start
+    CorpusIndex(config.get('corpus_index', {})).add_files(saved_files)
+    history.compact()
+    logger.save()
+
+    log_info("=" * 60)
+    saved_now = len(saved_files) - already_saved
+    log_info(f"批量补题完成: 成功保存 {len(saved_files)}/{len(selected_questions)} 道题目，"
+             f"本次 {saved_now} 道，耗时 {elapsed:.1f} 秒（{saved_now / max(elapsed, 1e-6) * 60:.1f} 题/分钟）")
+    http_pool.log_stats()
+    ai_generator.cache.log_summary()
+    ai_generator.cache.evict()
+    metrics.log_summary()
+    log_info("=" * 60)
+    log_info("")
+
+    # HTML、历史记录和 git 只在最后执行一次
+    publish_pages(config, args.config, saved_files, journal.date_str, selected_questions, journal, metrics,
+                  record_size=backfill_config.get('record_size', 20))
+
+    metrics.save(command='backfill', selected=len(selected_questions), saved=len(saved_files))
+    journal.complete()
+
+class DailyScheduler:
+    """常驻模式：按 daemon.run_at 每天定时运行，空闲时预取下一次运行的题目
+
+    预取在启动时和每次运行结束后进行：选题、获取详情并预先生成 AI 解答，进度写入
+    prefetch_journal.json（与 run_journal.json 格式相同），不保存文件也不写历史记录。
+    到点后以续跑的方式接续这份记录，关键路径上只剩保存、生成页面和提交推送。
+    预取失败或 AI 解答未全部生成时每隔 prefetch_retry_minutes 分钟重试，
+    到点时仍未完成的部分在正式运行中补齐。
+    """
+    def __init__(self, config: Dict, args: argparse.Namespace):
+        daemon_config = config.get('daemon', {})
+        self.config = config
+        self.args = args
+        self.run_at = args.at or daemon_config.get('run_at', '16:15')
+        self.prefetch_enabled = daemon_config.get('prefetch', True) and not args.no_prefetch
+        self.retry_minutes = daemon_config.get('prefetch_retry_minutes', 30)
+        self.journal_file = daemon_config.get('journal_file', 'prefetch_journal.json')
+        match = re.fullmatch(r'(\d{1,2}):(\d{2})', self.run_at)
+        self.run_time = (int(match.group(1)), int(match.group(2))) if match else None
+        if self.run_time and (self.run_time[0] > 23 or self.run_time[1] > 59):
+            self.run_time = None
+
+    def next_run_after(self, now: datetime) -> datetime:
+        """now 之后的下一次运行时间"""
+        run = now.replace(hour=self.run_time[0], minute=self.run_time[1], second=0, microsecond=0)
+        return run if run > now else run + timedelta(days=1)
+
+    def journal(self) -> RunJournal:
+        return RunJournal({'enabled': True, 'file': self.journal_file})
+
+    def load_history(self) -> QuestionHistory:
+        return QuestionHistory(self.config['history_file'], self.config.get('history_compact_threshold', 50))
+
+    def load_prefetch(self, history: QuestionHistory, date_str: str) -> Optional[Dict]:
+        """读取可用于 date_str 这次运行的预取记录
+
+        尚未开始保存的预取记录改为 date_str 的日期；其中的题目已被其他运行选过时作废。
+        已开始保存或发布的记录是被中断的正式运行，原样返回以便续跑。
+        """
+        journal = self.journal()
+        data = journal.load_unfinished()
+        if not data:
+            return None
+        if data['stages'] or any(item['stage'] == 'saved' for item in data['questions']):
+            return data
+        if any(history.contains(item['entry'][0]) for item in data['questions']):
+            log_info("⚠ 预取的题目已被其他运行选过，作废")
+            os.remove(self.journal_file)
+            return None
+        if data['date_str'] != date_str:
+            data['date_str'] = date_str
+            journal.data = data
+            journal.save()
+        return data
+
+    def prefetch(self, date_str: str) -> bool:
+        """预取 date_str 这次运行的题目，返回是否已全部就绪"""
+        history = self.load_history()
+        journal = self.journal()
+        unfinished = self.load_prefetch(history, date_str)
+        if unfinished and (unfinished['stages'] or any(item['stage'] == 'saved' for item in unfinished['questions'])):
+            log_info(f"上次定时运行 {unfinished['run_id']} 未完成，到点后继续，不再预取")
+            return True
+
+        metrics = RunMetrics(self.config.get('metrics', {}))
+        http_pool = HTTPSessionPool(self.config.get('http', {}))
+        fetcher = LeetCodeFetcher(
+            CatalogCache(self.config.get('catalog', {})),
+            QuestionStore(self.config.get('question_store', {})),
+            http_pool,
+            self.config.get('leetcode_url', 'https://leetcode.cn')
+        )
+        ai_generator = AISolutionGenerator(
+            self.config.get('deepseek', {}),
+            http_pool,
+            AISolutionCache(self.config.get('ai_cache', {}))
+        )
+        try:
+            if unfinished:
+                journal.resume(unfinished)
+                selected_questions = journal.selected_questions()
+                log_info(f"继续预取 {date_str} 的题目（{journal.progress()}）")
+            else:
+                log_info(f"正在预取 {date_str} 的题目...")
+                with metrics.span('catalog') as span:
+                    all_questions = fetcher.get_all_questions(offline=self.args.offline)
+                    span['ok'] = bool(all_questions)
+                if not all_questions:
+                    log_info("❌ 无法获取题目列表")
+                    return False
+                with metrics.span('select'):
+                    pool = SelectionPool(self.config.get('selection_pool_file', 'selection_pool.json'))
+                    pool.sync(all_questions, history, fetcher.new_question_ids)
+                    selected_questions = select_questions_by_difficulty(
+                        all_questions,
+                        self.config['difficulties'],
+                        history,
+                        pool
+                    )
+                    # 预取的题目移出待选池，避免被手动运行重复选中
+                    pool.save(history)
+                if not selected_questions:
+                    log_info("❌ 没有可选的题目（可能都已被选过）")
+                    return False
+                journal.start(date_str, selected_questions)
+
+            process_selected_questions(
+                selected_questions,
+                fetcher,
+                ai_generator,
+                self.config['output_dir'],
+                history,
+                ExecutionLogger("execution.log"),
+                self.config.get('pipeline', {}),
+                metrics,
+                journal,
+                prefetch=True
+            )
+            ready_stage = 'ai' if ai_generator.is_available() else 'detail'
+            ready = sum(1 for item in journal.data['questions'] if item['stage'] == ready_stage)
+            log_info(f"✓ 预取完成: {ready}/{len(selected_questions)} 道题目已就绪")
+            ai_generator.cache.evict()
+            metrics.save(command='prefetch', selected=len(selected_questions), ready=ready)
+            return ready == len(selected_questions)
+        finally:
+            ai_generator.close()
+            http_pool.close()
+
+    def run_once(self) -> int:
+        """执行一次定时运行：有可用的预取记录时直接接续"""
+        date_str = datetime.now().strftime("%Y%m%d")
+        started = time.time()
+        prefetched = self.load_prefetch(self.load_history(), date_str)
+        if prefetched:
+            log_info(f"使用预取的题目（{prefetched['run_id']}）")
+        saved = run_daily(self.config, self.args, self.journal(), resume=True)
+        log_info(f"✓ 定时运行完成: 保存 {saved} 道题目，从触发到发布共 {time.time() - started:.1f} 秒")
+        return saved
+
+    def serve(self):
+        """主循环：等待下一次运行时间，其间完成预取"""
+        if self.run_time is None:
+            log_info(f"❌ 无法识别的运行时间: {self.run_at}（格式为 HH:MM）")
+            return
+        # launchctl stop / kill 时正常退出，终止仍在运行的 CLI 子进程
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+        next_run = self.next_run_after(datetime.now())
+        log_info(f"常驻模式: 每天 {self.run_at} 运行，预取{'已开启' if self.prefetch_enabled else '已关闭'}，"
+                 f"下次运行 {next_run:%Y-%m-%d %H:%M}")
+        prefetch_ready = not self.prefetch_enabled
+        next_prefetch = time.time()
+        while True:
+            if not prefetch_ready and time.time() >= next_prefetch:
+                try:
+                    prefetch_ready = self.prefetch(next_run.strftime("%Y%m%d"))
+                except Exception as e:
+                    log_info(f"❌ 预取失败: {e}")
+                if not prefetch_ready:
+                    next_prefetch = time.time() + self.retry_minutes * 60
+                    log_info(f"{self.retry_minutes} 分钟后重试预取")
+
+            # 按墙上时间判断，休眠唤醒后错过的运行会立即补上
+            now = datetime.now()
+            if now >= next_run:
+                try:
+                    self.run_once()
+                except Exception as e:
+                    log_info(f"❌ 定时运行失败: {e}")
+                next_run = self.next_run_after(datetime.now())
+                prefetch_ready = not self.prefetch_enabled
+                next_prefetch = time.time()
+                log_info(f"下次运行 {next_run:%Y-%m-%d %H:%M}")
+                continue
+
+            wait = (next_run - now).total_seconds()
+            if not prefetch_ready:
+                wait = min(wait, next_prefetch - time.time())
+            time.sleep(min(max(wait, 1), 60))
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='LeetCode 每日题目获取脚本')
+    parser.add_argument('--config', help='配置文件路径（默认使用脚本目录下的 config.json）')
+    parser.add_argument('--offline', action='store_true',
+                        help='离线模式：从缓存的题目列表中选题，不请求题目列表接口')
+    parser.add_argument('--resume', action='store_true',
+                        help='继续上次中断的运行（沿用已选题目和已完成的阶段）；没有未完成的运行时正常执行')
+    subparsers = parser.add_subparsers(dest='command')
+
+    warm_parser = subparsers.add_parser('warm-store', help='批量预热或重新校验题目详情存储')
+    warm_parser.add_argument('slugs', nargs='*', help='指定题目 titleSlug（默认使用整个题目列表）')
+    warm_parser.add_argument('--difficulty', choices=['easy', 'medium', 'hard'], help='只处理指定难度')
+    warm_parser.add_argument('--limit', type=int, default=0, help='最多处理的题目数量')
+    warm_parser.add_argument('--workers', type=int, default=4, help='并发请求数')
+    warm_parser.add_argument('--revalidate', action='store_true', help='忽略过期策略，重新获取并比对所有题目')
+
+    build_parser = subparsers.add_parser('build', help='增量重建 GitHub Pages 页面（只处理已变化的页面）')
+    build_parser.add_argument('--force', action='store_true', help='忽略构建清单，重新生成所有页面')
+    build_parser.add_argument('--dry-run', action='store_true', help='只列出需要重新生成或删除的页面')
+
+    query_parser = subparsers.add_parser('query', help='查询已生成的题目（使用本地题库索引）')
+    query_parser.add_argument('numbers', nargs='*', help='题号，例如 1062 或 "LCR 031"')
+    query_parser.add_argument('--slug', help='题目 titleSlug')
+    query_parser.add_argument('--difficulty', choices=['easy', 'medium', 'hard'], help='只显示指定难度')
+    query_parser.add_argument('--tags', help='标签（逗号分隔，需全部匹配），例如 图,广度优先搜索')
+    query_parser.add_argument('--month', help='生成月份，例如 2026-03')
+    query_parser.add_argument('--since', help='起始日期（包含），YYYYMMDD 或 YYYY-MM-DD')
+    query_parser.add_argument('--until', help='结束日期（包含），YYYYMMDD 或 YYYY-MM-DD')
+    ai_group = query_parser.add_mutually_exclusive_group()
+    ai_group.add_argument('--ai', dest='ai', action='store_true', default=None, help='只显示有 AI 解答的题目')
+    ai_group.add_argument('--no-ai', dest='ai', action='store_false', help='只显示没有 AI 解答的题目')
+    query_parser.add_argument('--limit', type=int, default=0, help='最多显示的题目数量')
+    query_parser.add_argument('--json', action='store_true', help='以 JSON 输出')
+    query_parser.add_argument('--refresh', action='store_true', help='查询前重新检查所有文件（文件被原地修改时使用）')
+
+    daemon_parser = subparsers.add_parser('daemon', help='常驻模式：每天定时运行，并在空闲时预取下一次运行的题目和 AI 解答')
+    daemon_parser.add_argument('--at', help='每天的运行时间 HH:MM（默认使用 daemon.run_at）')
+    daemon_parser.add_argument('--no-prefetch', action='store_true', help='不预取，只按时运行')
+
+    subparsers.add_parser('publish', help='提交并推送发布队列中的记录（后台发布进程使用，也可手动补推）')
+
+    backfill_parser = subparsers.add_parser('backfill', help='批量补题：按题号范围、标签或难度数量一次生成多道题目')
+    backfill_parser.add_argument('--ids', help='题号范围，例如 1-100,200,305-310')
+    backfill_parser.add_argument('--tags', help='标签（逗号分隔，任一匹配即可），例如 动态规划,二分查找')
+    backfill_parser.add_argument('--easy', type=int, help='随机选出的简单题数量')
+    backfill_parser.add_argument('--medium', type=int, help='随机选出的中等题数量')
+    backfill_parser.add_argument('--hard', type=int, help='随机选出的困难题数量')
+    backfill_parser.add_argument('--limit', type=int, default=0, help='最多处理的题目数量（按题号顺序）')
+    backfill_parser.add_argument('--workers', type=int, default=0, help='AI 解答并发数（默认使用 backfill.ai_workers）')
+    backfill_parser.add_argument('--dry-run', action='store_true', help='只列出选中的题目')
+
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+
+    # 查询结果直接输出，不打印运行横幅
+    if args.command == 'query':
+        config = load_config(args.config)
+        if config:
+            run_query(config, args)
+        return
 
-def main():
     log_info("=" * 60)
     log_info("LeetCode 每日题目获取脚本 (DeepSeek AI 增强版)")
     log_info("=" * 60)
     log_info("")
 
     # 加载配置
-    config = load_config()
+    config = load_config(args.config)
     if not config:
         return
 
-    # 初始化执行日志
+    if args.command == 'warm-store':
+        run_warm_store(config, args)
+        return
+    if args.command == 'build':
+        run_build(config, args)
+        return
+    if args.command == 'backfill':
+        run_backfill(config, args)
+        return
+    if args.command == 'publish':
+        metrics = RunMetrics(config.get('metrics', {}))
+        publisher = GitHubPagesPublisher(config.get('github_pages', {}), metrics, args.config)
+        pushed = publisher.process_queue()
+        metrics.save(command='publish', pushed=pushed)
+        return
+    if args.command == 'daemon':
+        DailyScheduler(config, args).serve()
+        return
+
+    run_daily(config, args, RunJournal(config.get('run_journal', {})), resume=args.resume)
+
+def run_daily(config: Dict, args: argparse.Namespace, journal: RunJournal, resume: bool = False) -> int:
+    """每日运行：选题 → 详情 → AI 解答 → 保存 → 发布，返回保存的题目数
+
+    resume 为 True 且 journal 中有未完成的运行时沿用其中的题目和已完成的阶段
+    （常驻模式下预取的题目也通过这种方式接续）。
+    """
+    # 初始化执行日志和阶段耗时指标
     logger = ExecutionLogger("execution.log")
+    metrics = RunMetrics(config.get('metrics', {}))
 
     # 初始化历史记录
-    history = QuestionHistory(config['history_file'])
+    history = QuestionHistory(
+        config['history_file'],
+        config.get('history_compact_threshold', 50)
+    )
     stats = history.get_stats()
     log_info(f"历史记录: 已选择 {stats['total_selected']} 道题目")
 
+    # 初始化 HTTP 连接池（题目获取和 AI 生成共用）
+    http_pool = HTTPSessionPool(config.get('http', {}))
+
     # 初始化 AI 解答生成器
-    ai_generator = AISolutionGenerator(config.get('deepseek', {}))
+    ai_generator = AISolutionGenerator(
+        config.get('deepseek', {}),
+        http_pool,
+        AISolutionCache(config.get('ai_cache', {}))
+    )
     if ai_generator.is_available():
         mode_str = 'Claude CLI' if ai_generator.mode == 'claude_cli' else f'DeepSeek API (模型: {ai_generator.model})'
         log_info(f"AI 解答生成器: 已启用 ({mode_str})")
@@ -888,70 +4467,85 @@ def main():
     log_info("")
 
     # 获取题目列表
-    fetcher = LeetCodeFetcher()
-    log_info("正在获取题目列表...")
-    all_questions = fetcher.get_all_questions()
-
-    if not all_questions:
-        log_info("❌ 无法获取题目列表")
-        return
-
-    log_info(f"✓ 共获取 {len(all_questions)} 道题目")
-
-    # 按难度选择题目
-    selected_questions = select_questions_by_difficulty(
-        all_questions,
-        config['difficulties'],
-        history
+    fetcher = LeetCodeFetcher(
+        CatalogCache(config.get('catalog', {})),
+        QuestionStore(config.get('question_store', {})),
+        http_pool,
+        config.get('leetcode_url', 'https://leetcode.cn')
     )
+    # 断点续跑：沿用上次中断的运行选中的题目，不重新获取题目列表
+    unfinished = journal.load_unfinished()
+    pool = None
+    if resume and unfinished:
+        journal.resume(unfinished)
+        selected_questions = journal.selected_questions()
+        date_str = journal.date_str
+        log_info(f"✓ 继续上次未完成的运行 {unfinished['run_id']}（{journal.progress()}）")
+        log_info("")
+    else:
+        if resume:
+            log_info("没有未完成的运行，开始新的运行")
+        elif unfinished:
+            log_info(f"⚠ 上次运行 {unfinished['run_id']} 未完成（可使用 --resume 继续），本次开始新的运行")
+
+        log_info("正在获取题目列表...")
+        with metrics.span('catalog') as span:
+            all_questions = fetcher.get_all_questions(offline=args.offline)
+            span['ok'] = bool(all_questions)
+
+        if not all_questions:
+            log_info("❌ 无法获取题目列表")
+            metrics.save(saved=0)
+            return 0
+
+        log_info(f"✓ 共获取 {len(all_questions)} 道题目")
+
+        # 按难度选择题目
+        with metrics.span('select'):
+            pool = SelectionPool(config.get('selection_pool_file', 'selection_pool.json'))
+            pool.sync(all_questions, history, fetcher.new_question_ids)
+            selected_questions = select_questions_by_difficulty(
+                all_questions,
+                config['difficulties'],
+                history,
+                pool
+            )
 
-    if not selected_questions:
-        log_info("❌ 没有可选的题目（可能都已被选过）")
-        return
-
-    log_info(f"✓ 随机选择 {len(selected_questions)} 道题目")
-    log_info("")
-
-    # 获取详情并保存
-    saved_count = 0
-    saved_files = []  # 记录保存的文件路径
-    date_str = datetime.now().strftime("%Y%m%d")
-
-    for i, q in enumerate(selected_questions, 1):
-        log_info(f"[{i}/{len(selected_questions)}] {q['difficulty']} - {q['questionFrontendId']}. {q['title']}")
+        if not selected_questions:
+            log_info("❌ 没有可选的题目（可能都已被选过）")
+            metrics.save(saved=0)
+            return 0
 
-        # 获取详情
-        detail = fetcher.get_question_detail(q['titleSlug'])
-        if not detail:
-            log_info(f"  ✗ 跳过（获取失败）")
-            logger.add_result(i, False, q['title'])
-            continue
-
-        # 获取 AI 解答
-        ai_solution = None
-        if ai_generator.is_available():
-            log_info(f"  正在生成 AI 解答...")
-            ai_solution = ai_generator.generate_solution(detail)
-            if ai_solution:
-                log_info(f"  ✓ AI 解答已生成")
-
-        # 保存 Markdown
-        if save_as_markdown(detail, ai_solution, config['output_dir']):
-            saved_count += 1
-            history.add(q['questionId'])
-            logger.add_result(i, True, q['title'])
+        log_info(f"✓ 随机选择 {len(selected_questions)} 道题目")
+        log_info("")
 
-            # 记录保存的文件
-            chinese_title = detail['title']
-            chinese_title = re.sub(r'[<>:"/\\|?*]', '', chinese_title).strip()
-            difficulty_map = {'Easy': '简单', 'Medium': '中等', 'Hard': '困难'}
-            difficulty_cn = difficulty_map.get(detail['difficulty'], detail['difficulty'])
-            filename = f"{detail['questionFrontendId']}_{difficulty_cn}_{chinese_title}_{date_str}.md"
-            saved_files.append(os.path.join(config['output_dir'], filename))
-        else:
-            logger.add_result(i, False, q['title'])
+        date_str = datetime.now().strftime("%Y%m%d")
+        journal.start(date_str, selected_questions)
 
-        log_info("")
+    # 获取详情、生成 AI 解答并保存（分阶段并发）
+    try:
+        saved_files = process_selected_questions(
+            selected_questions,
+            fetcher,
+            ai_generator,
+            config['output_dir'],
+            history,
+            logger,
+            config.get('pipeline', {}),
+            metrics,
+            journal
+        )
+    finally:
+        # 正常结束或被中断时都终止仍在运行的 CLI 子进程
+        ai_generator.close()
+    saved_count = len(saved_files)
+    CorpusIndex(config.get('corpus_index', {})).add_files(saved_files)
+
+    # 处理失败的题目放回待选池，下次仍可能被选中
+    # （选题时已保存移出这些题目后的待选池，续跑时同样需要放回）
+    if pool is None:
+        pool = SelectionPool(config.get('selection_pool_file', 'selection_pool.json'))
+    pool.release(selected_questions, history)
 
     # 保存执行日志
     logger.save()
@@ -960,40 +4554,25 @@ def main():
     log_info(f"完成! 成功保存 {saved_count} 道题目")
     log_info(f"保存位置: {os.path.abspath(config['output_dir'])}")
     log_info(f"历史记录: 累计已选择 {len(history.history)} 道题目")
+    http_pool.log_stats()
+    ai_generator.cache.log_summary()
+    ai_generator.cache.evict()
+    metrics.log_summary()
     log_info("=" * 60)
     log_info("")
 
     # GitHub Pages 发布
-    github_config = config.get('github_pages', {})
-    if github_config.get('enabled', False) and saved_files:
-        log_info("正在生成 GitHub Pages...")
+    publish_pages(config, args.config, saved_files, date_str, selected_questions, journal, metrics)
 
-        # 获取当前时间戳（时分秒）
-        time_str = datetime.now().strftime("%H%M%S")
+    # 追加本次运行的阶段耗时指标
+    metrics.save(selected=len(selected_questions), saved=saved_count)
+    journal.complete()
 
-        # 生成 HTML（三层架构）
-        html_gen = HTMLGenerator("docs")
-        questions = html_gen.convert_markdown_to_html(saved_files, date_str, time_str)
-
-        if questions:
-            # 更新历史记录 JSON
-            html_gen.update_history_json(date_str, time_str, questions)
-
-            # 推送到 GitHub
-            publisher = GitHubPagesPublisher(github_config)
-            if publisher.is_available():
-                log_info("")
-                log_info("正在推送到 GitHub...")
-                publisher.git_add_commit_push(date_str, selected_questions)
-            else:
-                log_info("  ⚠ GitHub Pages 未完全配置，跳过推送")
-                log_info("  提示: 查看 GITHUB_PAGES_SETUP.md 了解配置步骤")
-
-        log_info("")
-        log_info("=" * 60)
+    http_pool.close()
 
     # 发送系统通知
     send_notification("LeetCode Job", "job 执行完毕")
+    return saved_count
 
 if __name__ == "__main__":
     main()